@@ -0,0 +1,78 @@
+import argparse
+import time
+import numpy as np
+
+from modular_arithmetic import ShoupMultiplier, gate_limit, halve_mod
+from theorem_verifier import PRIME_MOD
+
+# ==============================================================================
+# MODULAR ARITHMETIC MICROBENCHMARK
+# Per-operation cost of the division-based hot-loop formulation versus the
+# division-free replacements in modular_arithmetic.py. Every pair is checked
+# for bit-identical output before it is timed.
+# ==============================================================================
+
+def time_op(op, repeat):
+    op() # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        op()
+    return (time.perf_counter() - start) / repeat
+
+def build_ops(n, k_val):
+    """
+    (name, division-based op, division-free op) triples over the fiber array `n`.
+    """
+    p = PRIME_MOD
+    inv2 = pow(2, p - 2, p)
+    ratio = k_val * pow(4, p - 2, p) % p
+    times_k = ShoupMultiplier(k_val, p)
+    times_ratio = ShoupMultiplier(ratio, p)
+    limit = gate_limit(k_val, p)
+
+    out = np.empty_like(n)
+    scratch = np.empty_like(n)
+    gate = np.empty(n.size, dtype=bool)
+
+    def mod_mul(c):
+        def op():
+            np.multiply(n, c, out=out)
+            return np.remainder(out, p, out=out)
+        return op
+
+    def gate_div():
+        np.multiply(n, k_val, out=out)
+        np.floor_divide(out, p, out=out)
+        return np.equal(out, 0, out=gate)
+
+    return [
+        ("n * inv2 % p", mod_mul(inv2), lambda: halve_mod(n, p, out=out, scratch=scratch)),
+        ("K * n % p", mod_mul(k_val), lambda: times_k(n, out=out, scratch=scratch)),
+        ("(K/4) * n % p", mod_mul(ratio), lambda: times_ratio(n, out=out, scratch=scratch)),
+        ("K * n // p == 0", gate_div, lambda: np.less_equal(n, limit, out=gate)),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark the division-free modular operations.")
+    parser.add_argument("--size", type=int, default=1 << 16)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    n = np.random.randint(0, PRIME_MOD, args.size, dtype=np.int64)
+
+    print(f"--- MODULAR ARITHMETIC MICROBENCHMARK (N={args.size}, K={args.k}) ---")
+    print(f"{'Operation':<16} | {'Division (ns/op)':>16} | {'Div-free (ns/op)':>16} | {'Speedup':>7}")
+    print("-" * 66)
+
+    for name, baseline, replacement in build_ops(n, args.k):
+        if not np.array_equal(baseline(), replacement()):
+            raise AssertionError(f"{name}: division-free result differs")
+        base_ns = 1e9 * time_op(baseline, args.repeat) / args.size
+        free_ns = 1e9 * time_op(replacement, args.repeat) / args.size
+        print(f"{name:<16} | {base_ns:>16.2f} | {free_ns:>16.2f} | {base_ns / free_ns:>6.2f}x")
+
+    print("-" * 66)
+
+if __name__ == "__main__":
+    main()
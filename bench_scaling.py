@@ -0,0 +1,178 @@
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+import numba_backend
+from theorem_verifier import (SELF_PARALLEL_ENGINES, TEST_STEPS, merge_window_results, select_engine,
+                              simulate_window_invariance)
+
+# ==============================================================================
+# STRONG / WEAK SCALING BENCHMARK
+# Times the Safe Window workload at fixed total N (strong scaling) and at fixed
+# N per worker (weak scaling) for 1..all cores, parallelized with threads,
+# processes or the compiled numba backend. Every measurement runs in a fresh
+# spawned process so its peak RSS is its own; runs are seeded, so all runs
+# of one size must report the same survivors. Output is JSON:
+#   particle_steps_per_second = N * steps / seconds
+#   efficiency = T(1) / (workers * T(workers))   (strong)
+#                T(1) / T(workers)               (weak)
+# relative to the smallest worker count measured (normally 1). The threads and
+# processes modes run a NumPy engine with numba pinned to one thread, so only
+# the numba mode varies the number of compiled-kernel threads.
+# ==============================================================================
+
+MODES = ("threads", "processes", "numba")
+STRONG_SIZE = 10**7  # Total particles for strong scaling
+WEAK_SIZE = 10**6  # Particles per worker for weak scaling
+WORKER_ENGINE = "fused"  # Threads/processes engine when the chosen one is self-parallel
+
+def _worker_counts():
+    """
+    1, 2, 4, ... up to the core count, plus the core count itself.
+    """
+    cores = os.cpu_count() or 1
+    counts = [1 << i for i in range(cores.bit_length()) if 1 << i <= cores]
+    return counts + ([cores] if counts[-1] != cores else [])
+
+def _peak_rss_bytes(who):
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # Linux reports KiB
+
+def _chunk_task(k_val, engine, tile_size, steps, seed, offset, size):
+    return simulate_window_invariance(k_val, engine=engine, batch_size=size, steps=steps,
+                                      tile_size=tile_size, seed=seed, offset=offset)
+
+def _run_workload(mode, workers, batch_size, k_val, steps, engine, tile_size, seed, pool):
+    if mode == "threads":
+        numba_backend.pin_single_thread()
+        return simulate_window_invariance(k_val, engine=engine, batch_size=batch_size, steps=steps,
+                                          tile_size=tile_size, seed=seed, threads=workers)
+    if mode == "numba":
+        numba_backend.numba.set_num_threads(workers)
+        return simulate_window_invariance(k_val, engine="numba", batch_size=batch_size, steps=steps,
+                                          seed=seed)
+    chunk = -(-batch_size // workers)
+    offsets = range(0, batch_size, chunk)
+    sizes = [min(chunk, batch_size - offset) for offset in offsets]
+    parts = pool.map(_chunk_task, *zip(*[(k_val, engine, tile_size, steps, seed, offset, size)
+                                         for offset, size in zip(offsets, sizes)]))
+    return merge_window_results(parts)
+
+def _measure(mode, workers, batch_size, k_val, steps, engine, tile_size, seed, repeat):
+    """
+    Best-of-`repeat` seconds after one warm-up run, with this process's peak RSS.
+
+    Runs inside a fresh process; the process pool (mode "processes") is started
+    and warmed up before timing, so only the workload is measured.
+    """
+    pool = None
+    if mode == "processes":
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                      mp_context=multiprocessing.get_context("spawn"),
+                                                      initializer=numba_backend.pin_single_thread)
+    try:
+        result = _run_workload(mode, workers, batch_size, k_val, steps, engine, tile_size, seed, pool)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = _run_workload(mode, workers, batch_size, k_val, steps, engine, tile_size, seed, pool)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return {
+        "seconds": best,
+        "survivors": result.survivors,
+        "peak_rss_bytes": _peak_rss_bytes(resource.RUSAGE_SELF),
+        "peak_worker_rss_bytes": _peak_rss_bytes(resource.RUSAGE_CHILDREN) if pool is not None else 0,
+    }
+
+def run_scaling(modes=MODES, worker_counts=None, strong_size=STRONG_SIZE, weak_size=WEAK_SIZE, k_val=4,
+                steps=TEST_STEPS, engine="auto", seed=0, repeat=3):
+    """
+    Strong and weak scaling runs for every mode and worker count; returns the JSON report as a dict.
+    """
+    worker_counts = sorted(worker_counts or _worker_counts())
+    if not numba_backend.NUMBA_AVAILABLE:
+        modes = [mode for mode in modes if mode != "numba"]
+
+    tile_size = None
+    if engine == "auto":
+        engine, tile_size = select_engine(weak_size, steps)
+    if engine in SELF_PARALLEL_ENGINES:
+        # Its kernel already spreads over every core: a 1-worker baseline would not be serial
+        engine, tile_size = WORKER_ENGINE, None
+
+    # Spawned children read this before importing numba; its pool cannot grow later
+    os.environ["NUMBA_NUM_THREADS"] = str(max(worker_counts[-1], int(os.environ.get("NUMBA_NUM_THREADS", 0))))
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    for scaling in ("strong", "weak"):
+        for mode in modes:
+            base_seconds = base_workers = None
+            for workers in worker_counts:
+                batch_size = strong_size if scaling == "strong" else weak_size * workers
+                with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as isolated:
+                    run = isolated.submit(_measure, mode, workers, batch_size, k_val, steps, engine,
+                                          tile_size, seed, repeat).result()
+                if base_seconds is None:
+                    base_seconds, base_workers = run["seconds"], workers
+                ideal = base_seconds * base_workers / workers if scaling == "strong" else base_seconds
+                run.update(scaling=scaling, mode=mode, workers=workers, batch_size=batch_size,
+                           particle_steps_per_second=batch_size * steps / run["seconds"],
+                           efficiency=ideal / run["seconds"])
+                runs.append(run)
+
+    for scaling in ("strong", "weak"):
+        survivors = {}
+        for run in runs:
+            if run["scaling"] == scaling:
+                expected = survivors.setdefault(run["batch_size"], run["survivors"])
+                if run["survivors"] != expected:
+                    raise AssertionError(f"{run['mode']} x{run['workers']} disagrees: "
+                                         f"{run['survivors']} != {expected} survivors")
+
+    return {
+        "host": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "k": k_val,
+        "steps": steps,
+        "engine": engine,
+        "tile_size": tile_size,
+        "seed": seed,
+        "repeat": repeat,
+        "runs": runs,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Strong/weak scaling benchmark of the parallel verifier.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--workers", type=int, nargs="+", help="worker counts (default: 1, 2, 4, ... cores)")
+    parser.add_argument("--strong-size", type=int, default=STRONG_SIZE, help="total particles (strong scaling)")
+    parser.add_argument("--weak-size", type=int, default=WEAK_SIZE, help="particles per worker (weak scaling)")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=TEST_STEPS)
+    parser.add_argument("--engine", default="auto",
+                        help=f"engine for the threads/processes modes (numba is replaced by {WORKER_ENGINE})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run_scaling(args.modes, args.workers, args.strong_size, args.weak_size, args.k, args.steps,
+                         args.engine, args.seed, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import time
+import numpy as np
+
+from theorem_verifier import PRIME_MOD, TEST_STEPS, _engine_fused, _engine_reference
+
+# ==============================================================================
+# STEP KERNEL BENCHMARK
+# Reference (masked gather/scatter + np.isin) vs fused (scratch buffers) kernel.
+# Both kernels see the same initial fibers and must agree on the survivor count.
+# ==============================================================================
+
+KERNELS = {
+    "reference": _engine_reference,
+    "fused": _engine_fused,
+}
+
+def bench_kernels(k_val, size, steps, repeat):
+    """
+    Time each kernel on `size` particles; returns {name: (best_seconds, outcome)},
+    where outcome is the kernel's (survivors, last exit step, steps run).
+    """
+    limit = (PRIME_MOD - 1) // k_val
+    n0 = np.random.randint(1, limit + 1, size, dtype=np.int64)
+
+    results = {}
+    for name, kernel in KERNELS.items():
+        best = float("inf")
+        for _ in range(repeat):
+            n = n0.copy()
+            start = time.perf_counter()
+            outcome = kernel(n, k_val, steps)
+            best = min(best, time.perf_counter() - start)
+            del n
+        results[name] = (best, outcome)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the reference and fused step kernels.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**6, 10**7, 10**8])
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=TEST_STEPS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"--- STEP KERNEL BENCHMARK (K={args.k}, steps={args.steps}, best of {args.repeat}) ---")
+    print(f"{'N':<12} | {'Kernel':<10} | {'Time (s)':>10} | {'ns / particle-step':>18} | {'Speedup':>7}")
+    print("-" * 70)
+
+    for size in args.sizes:
+        results = bench_kernels(args.k, size, args.steps, args.repeat)
+        base_time, base_outcome = results["reference"]
+        for name, (elapsed, outcome) in results.items():
+            if outcome != base_outcome:
+                raise AssertionError(f"{name} disagrees with reference: {outcome} != {base_outcome}")
+            per_step = 1e9 * elapsed / (size * outcome[2])
+            print(f"{size:<12} | {name:<10} | {elapsed:>10.3f} | {per_step:>18.2f} | {base_time / elapsed:>6.2f}x")
+        print("-" * 70)
+
+if __name__ == "__main__":
+    main()
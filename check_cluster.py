@@ -0,0 +1,150 @@
+import argparse
+import socket
+import sys
+import threading
+import time
+
+from sweep_cluster import SweepCoordinator, _receive, _send, run_worker
+from theorem_verifier import simulate_window_invariance
+
+# ==============================================================================
+# CLUSTER FAULT-TOLERANCE CHECK
+# Runs a small seeded sweep through a localhost coordinator with a short lease.
+# Misbehaving clients take the first tasks before any regular worker starts:
+#   garbage     non-JSON lines, messages without a type, malformed and
+#               impossible results (all must be rejected, connection kept)
+#   error       reports its task as failed (re-queued)
+#   disconnect  closes the connection holding a task (released)
+#   stall       holds a task past its lease (re-issued), answers late
+# Two regular workers then finish the sweep. The merged per-K results must
+# equal one single-process run of the same seeded draw, and every fault must
+# have cost its task an extra lease. Exits non-zero on any failure.
+# ==============================================================================
+
+CHECK_K = (3, 4, 5)
+CHECK_BATCH = 20_000
+CHECK_CHUNK = 5_000
+CHECK_LEASE = 1.0  # Seconds; short, so the stalled task is re-issued quickly
+
+class _Client:
+    """
+    Raw protocol connection that plays a misbehaving worker.
+    """
+
+    def __init__(self, port):
+        self.sock = socket.create_connection(("127.0.0.1", port))
+        self.stream = self.sock.makefile("rwb")
+
+    def ask(self, message):
+        if isinstance(message, bytes):
+            self.stream.write(message)
+            self.stream.flush()
+        else:
+            _send(self.stream, message)
+        return _receive(self.stream)
+
+    def take_task(self):
+        reply = self.ask({"type": "request"})
+        if reply["type"] != "task":
+            raise AssertionError(f"expected a task, got {reply}")
+        return reply
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+def _fake_result(task, **changes):
+    k_val, _ = task["task"]
+    result = {"k_val": k_val, "batch_size": task["batch_size"], "steps": task["steps"],
+              "steps_run": task["steps"], "survivors": task["batch_size"], "extinction_step": None}
+    result.update(changes)
+    return {"type": "result", "task": task["task"], "result": result}
+
+def check_cluster(k_values=CHECK_K, batch_size=CHECK_BATCH, chunk_size=CHECK_CHUNK, lease=CHECK_LEASE, seed=0):
+    """
+    Run the faulty sweep; returns a list of failure descriptions.
+    """
+    failures = []
+    coordinator = SweepCoordinator(k_values, batch_size, chunk_size, seed=seed, port=0, lease_seconds=lease)
+    port = coordinator.address[1]
+    outcome = {}
+    server = threading.Thread(target=lambda: outcome.update(results=coordinator.serve()), daemon=True)
+    server.start()
+
+    def expect(client, message, kind, label):
+        reply = client.ask(message)
+        if reply is None or reply["type"] != kind:
+            failures.append(f"{label}: expected {kind}, got {reply}")
+
+    # Garbage: every bad message is rejected and the connection keeps working
+    garbage = _Client(port)
+    expect(garbage, b"not json\n", "reject", "non-JSON line")
+    expect(garbage, {"task": [3, 0]}, "reject", "message without type")
+    expect(garbage, {"type": "bogus"}, "reject", "unknown type")
+    expect(garbage, {"type": "result", "task": [999, 0], "result": {}}, "reject", "unknown task")
+    malformed_task = garbage.take_task()
+    expect(garbage, {"type": "result", "task": malformed_task["task"], "result": [1, 2]}, "reject",
+           "malformed result")
+    impossible_task = garbage.take_task()
+    expect(garbage, _fake_result(impossible_task, survivors=batch_size + 1), "reject", "impossible result")
+    expect(garbage, _fake_result(impossible_task, steps=1), "reject", "result for another horizon")
+    garbage.close()
+
+    error = _Client(port)
+    error_task = error.take_task()
+    expect(error, {"type": "error", "task": error_task["task"], "message": "injected"}, "ack", "error report")
+    error.close()
+
+    disconnect = _Client(port)
+    disconnect_task = disconnect.take_task()
+    disconnect.close()
+
+    stall = _Client(port)
+    stall_task = stall.take_task()
+
+    workers = [threading.Thread(target=run_worker, args=("127.0.0.1", port, "reference"), daemon=True)
+               for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    time.sleep(2 * lease)
+    # Late answer for a task that was re-issued meanwhile: must not break the merge
+    k_val, _ = stall_task["task"]
+    late = simulate_window_invariance(k_val, "reference", batch_size=stall_task["batch_size"],
+                                      steps=stall_task["steps"], seed=seed, offset=stall_task["offset"])
+    try:
+        stall.ask({"type": "result", "task": stall_task["task"], "result": late._asdict()})
+    except OSError:
+        pass # The sweep may already be over
+    stall.close()
+
+    for worker in workers:
+        worker.join(timeout=120)
+    server.join(timeout=10)
+    if "results" not in outcome:
+        return failures + ["coordinator did not finish the sweep"]
+
+    for label, task in (("malformed", malformed_task), ("impossible", impossible_task), ("error", error_task),
+                        ("disconnect", disconnect_task), ("stall", stall_task)):
+        key = tuple(task["task"])
+        if coordinator.state.attempts[key] < 2:
+            failures.append(f"{label}: task {list(key)} was never handed out again")
+
+    for k_val in k_values:
+        expected = simulate_window_invariance(k_val, "reference", batch_size=batch_size, seed=seed)
+        if outcome["results"][k_val] != expected:
+            failures.append(f"K={k_val}: merged {outcome['results'][k_val]} != {expected}")
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the sweep coordinator against faulty localhost workers.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    failures = check_cluster(seed=args.seed)
+    for failure in failures:
+        print(failure)
+    print(f"--- CLUSTER FAULT TOLERANCE: {'OK' if not failures else f'{len(failures)} FAILURES'} ---")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
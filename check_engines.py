@@ -0,0 +1,78 @@
+import argparse
+import itertools
+import sys
+import numpy as np
+
+from theorem_verifier import ENGINES, _engine_reference, draw_window_fibers, simulate_window_invariance
+
+# ==============================================================================
+# ENGINE EQUIVALENCE CHECK
+# Every registered engine must return exactly the reference outcome
+# (survivors, last exit step, steps run). Each engine is run on the same
+# seeded window fibers, stored as int64 and as compact uint32. The runs cover
+# steps = 0, step counts that are and are not multiples of 3, and
+# stop_at = 0 and > 0. The tiled and threaded paths of
+# simulate_window_invariance are checked the same way. Exits non-zero on any
+# disagreement.
+# ==============================================================================
+
+CHECK_K = (2, 3, 4, 5, 16)
+CHECK_STEPS = (0, 1, 2, 3, 7, 20, 61)
+CHECK_SIZE = 2000
+
+def check_kernels(k_values=CHECK_K, step_counts=CHECK_STEPS, size=CHECK_SIZE, seed=0):
+    """
+    Compare every engine kernel with the reference; returns a list of mismatch descriptions.
+    """
+    mismatches = []
+    for k_val, steps in itertools.product(k_values, step_counts):
+        for compact in (False, True):
+            n0 = draw_window_fibers(k_val, seed, size, compact_dtypes=compact)
+            for stop_at in (0, 1, size // 2):
+                expected = tuple(_engine_reference(n0.astype(np.int64), k_val, steps, stop_at))
+                for name, kernel in ENGINES.items():
+                    try:
+                        outcome = tuple(kernel(n0.copy(), k_val, steps, stop_at))
+                    except Exception as e:
+                        outcome = repr(e)
+                    if outcome != expected:
+                        mismatches.append(f"{name}: K={k_val} steps={steps} {n0.dtype} stop_at={stop_at}: "
+                                          f"{outcome} != {expected}")
+    return mismatches
+
+def check_runs(k_values=CHECK_K, steps=CHECK_STEPS[-1], size=CHECK_SIZE, seed=0):
+    """
+    Compare tiled and threaded simulate_window_invariance runs with one untiled reference run.
+    """
+    mismatches = []
+    for k_val in k_values:
+        expected = simulate_window_invariance(k_val, "reference", batch_size=size, steps=steps,
+                                              tile_size=0, seed=seed)
+        for name, compact, tile_size, threads in itertools.product(ENGINES, (False, True), (0, 300), (1, 3)):
+            try:
+                result = simulate_window_invariance(k_val, name, batch_size=size, steps=steps, compact_dtypes=compact,
+                                                    tile_size=tile_size, threads=threads, seed=seed)
+            except Exception as e:
+                result = repr(e)
+            if result != expected:
+                mismatches.append(f"{name}: K={k_val} compact={compact} tile_size={tile_size} threads={threads}: "
+                                  f"{result} != {expected}")
+    return mismatches
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that every engine agrees exactly with the reference.")
+    parser.add_argument("--k", type=int, nargs="+", default=list(CHECK_K))
+    parser.add_argument("--size", type=int, default=CHECK_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    mismatches = check_kernels(args.k, size=args.size, seed=args.seed)
+    mismatches += check_runs(args.k, size=args.size, seed=args.seed)
+    for mismatch in mismatches:
+        print(mismatch)
+    print(f"--- ENGINE EQUIVALENCE: {len(ENGINES)} engines, "
+          f"{'OK' if not mismatches else f'{len(mismatches)} MISMATCHES'} ---")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
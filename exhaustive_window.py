@@ -0,0 +1,154 @@
+import argparse
+import collections
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+
+import numba_backend
+from theorem_verifier import ENGINES, PRIME_MOD, TEST_STEPS, _run_tiles, auto_tile_size, select_engine
+
+# ==============================================================================
+# EXHAUSTIVE WINDOW VERIFICATION
+# Instead of sampling, every fiber n in [1, (p-1)//K] is run through the
+# dynamics. The window is cut into fixed chunks of consecutive fibers,
+# generated in place with np.arange (no RNG, no stored population), and the
+# chunks are spread over a process pool. Per-chunk outcomes are merged
+# exactly; the set of finished chunks plus the running totals form a
+# checkpoint, so a pass over p ~ 10^9 can be interrupted and resumed.
+# ==============================================================================
+
+EXHAUSTIVE_CHUNK_SIZE = 1 << 22  # Fibers per task (32 MB of int64 state)
+CHECKPOINT_SECONDS = 30.0  # Minimum time between checkpoint writes
+
+class ExhaustiveResult(collections.namedtuple(
+        "ExhaustiveResult", "k_val limit steps checked survivors extinction_step")):
+    """
+    Outcome of an exhaustive pass: `checked` fibers of [1, limit], `survivors` of them stayed on the loop.
+    """
+    __slots__ = ()
+
+    @property
+    def complete(self):
+        return self.checked == self.limit
+
+    @property
+    def window_invariant(self):
+        """
+        True once every fiber of the window is checked and all of them survived.
+        """
+        return self.complete and self.survivors == self.limit
+
+def _init_worker():
+    # One process per core already; the compiled kernel must not oversubscribe it
+    if numba_backend.NUMBA_AVAILABLE:
+        numba_backend.numba.set_num_threads(1)
+
+def _check_chunk(k_val, first, last, steps, engine, tile_size):
+    """
+    Engine outcome (survivors, last exit step, steps run) for fibers first..last inclusive.
+    """
+    n = np.arange(first, last + 1, dtype=np.int64)
+    return _run_tiles(ENGINES[engine], n, k_val, steps, 0, tile_size or n.size)
+
+def _save_checkpoint(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def exhaustive_window_check(k_val=4, steps=TEST_STEPS, workers=0, chunk_size=EXHAUSTIVE_CHUNK_SIZE,
+                            engine="auto", checkpoint_path=None, resume=False, on_chunk=None):
+    """
+    Run every fiber of the Safe Window [1, (p-1)//K] for `steps` steps; returns an ExhaustiveResult.
+
+    Chunks of `chunk_size` consecutive fibers run on a spawned process pool
+    (workers=0 uses all cores). With checkpoint_path the finished chunk
+    indices and running totals are written at most every CHECKPOINT_SECONDS
+    and at the end; resume=True continues from that file. on_chunk(checked,
+    survivors) is called after every finished chunk.
+    """
+    limit = (PRIME_MOD - 1) // k_val
+    chunks = -(-limit // chunk_size) if limit > 0 else 0
+    workers = workers or os.cpu_count() or 1
+    tile_size = auto_tile_size()
+    if engine == "auto":
+        engine, tile_size = select_engine(chunk_size, steps)
+
+    state = {"k_val": k_val, "steps": steps, "chunk_size": chunk_size, "done": [],
+             "checked": 0, "survivors": 0, "last_exit": -1}
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            saved = json.load(f)
+        if (saved["k_val"], saved["steps"], saved["chunk_size"]) != (k_val, steps, chunk_size):
+            raise ValueError(f"Checkpoint {checkpoint_path} is for another run: "
+                             f"K={saved['k_val']}, steps={saved['steps']}, chunk_size={saved['chunk_size']}")
+        state = saved
+
+    done = set(state["done"])
+    last_saved = time.monotonic()
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                                initializer=_init_worker) as pool:
+        tasks = {}
+        for index in range(chunks):
+            if index not in done:
+                first = 1 + index * chunk_size
+                last = min(first + chunk_size - 1, limit)
+                tasks[pool.submit(_check_chunk, k_val, first, last, steps, engine, tile_size)] = (index, last - first + 1)
+        try:
+            for task in concurrent.futures.as_completed(tasks):
+                index, size = tasks[task]
+                survivors, last_exit, _ = task.result()
+                state["checked"] += size
+                state["survivors"] += survivors
+                state["last_exit"] = max(state["last_exit"], last_exit)
+                state["done"].append(index)
+                if on_chunk is not None:
+                    on_chunk(state["checked"], state["survivors"])
+                if checkpoint_path and time.monotonic() - last_saved >= CHECKPOINT_SECONDS:
+                    _save_checkpoint(checkpoint_path, state)
+                    last_saved = time.monotonic()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if checkpoint_path:
+                _save_checkpoint(checkpoint_path, state) # Everything merged so far, even on interrupt
+
+    extinct = state["checked"] == limit > 0 and state["survivors"] == 0
+    return ExhaustiveResult(k_val, limit, steps, state["checked"], state["survivors"],
+                            state["last_exit"] if extinct and state["last_exit"] >= 0 else None)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check every fiber of the Safe Window, not a sample.")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=TEST_STEPS)
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (0 = all cores)")
+    parser.add_argument("--chunk-size", type=int, default=EXHAUSTIVE_CHUNK_SIZE)
+    parser.add_argument("--engine", default="auto")
+    parser.add_argument("--checkpoint", help="progress file (resumed with --resume)")
+    parser.add_argument("--resume", action="store_true")
+    args = parser.parse_args(argv)
+
+    limit = (PRIME_MOD - 1) // args.k
+    start = time.perf_counter()
+
+    def progress(checked, survivors):
+        elapsed = time.perf_counter() - start
+        print(f"\r{checked}/{limit} fibers ({100 * checked / limit:5.1f}%), {survivors} survivors, "
+              f"{elapsed:7.1f}s", end="", flush=True)
+
+    result = exhaustive_window_check(args.k, args.steps, args.workers, args.chunk_size, args.engine,
+                                     args.checkpoint, args.resume, progress)
+    print()
+    print(f"--- EXHAUSTIVE VERIFICATION (K={args.k}, n in [1, {limit}], {args.steps} steps) ---")
+    print(f"checked {result.checked} fibers, {result.survivors} survivors")
+    if result.window_invariant:
+        print("[STRICT INVARIANCE CONFIRMED FOR EVERY FIBER]")
+    elif result.extinction_step is not None:
+        print(f"[EXTINCTION @ step {result.extinction_step}]")
+
+if __name__ == "__main__":
+    main()
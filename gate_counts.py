@@ -0,0 +1,114 @@
+import argparse
+import time
+import numpy as np
+
+from modular_arithmetic import ShoupMultiplier, gate_limit
+from theorem_verifier import PRIME_MOD, draw_window_fibers
+
+# ==============================================================================
+# EXACT GATE-PASS COUNTS (FLOOR SUMS)
+# After k returns a window fiber n sits at a*n mod p with a = (K/4)^k, so the
+# number of window fibers passing the gate at return k is
+#   #{n in [1, L] : (a n mod p) <= L},   L = (p-1)//K.
+# For a residue r = a n mod p, floor(a n / p) - floor((a n - L - 1) / p) is 1
+# exactly when r <= L, so the count is a difference of two floor sums, each
+# computed by a Euclid-like recursion in O(log p) integer operations.
+# These exact per-return fractions replace simulation for single returns
+# and are cross-checked against Monte Carlo estimates.
+# ==============================================================================
+
+def floor_sum(n, m, a, b):
+    """
+    sum_{i=0}^{n-1} floor((a*i + b) / m) for n >= 0, m >= 1 and any integers a, b.
+    """
+    # Negative (or >= m) a and b: split off the integer parts first
+    total = n * (n - 1) // 2 * (a // m) + n * (b // m)
+    a, b = a % m, b % m
+    while True:
+        if a >= m:
+            total += n * (n - 1) // 2 * (a // m)
+            a %= m
+        if b >= m:
+            total += n * (b // m)
+            b %= m
+        y_max = a * n + b
+        if y_max < m:
+            return total
+        # Count lattice points under the line from the other axis
+        n, b, m, a = y_max // m, y_max % m, a, m
+
+def window_pass_count(a, limit, p):
+    """
+    #{n in [1, limit] : (a n mod p) <= limit}, for 0 <= limit < p.
+    """
+    # sum over n = 1..limit, i.e. i = n - 1 = 0..limit-1 with a n = a i + a
+    return floor_sum(limit, p, a, a) - floor_sum(limit, p, a, a - limit - 1)
+
+def return_pass_count(k_val, k, p=PRIME_MOD):
+    """
+    Window fibers whose k-th return passes the carry gate (k = 0 is the start: all of them).
+    """
+    limit = gate_limit(k_val, p)
+    a = pow(k_val * pow(4, -1, p) % p, k, p) # (K/4)^k mod p
+    return window_pass_count(a, limit, p)
+
+def return_pass_fractions(k_val, returns, p=PRIME_MOD):
+    """
+    Exact fraction of the Safe Window passing the gate at return k, for k = 1..returns.
+    """
+    limit = gate_limit(k_val, p)
+    if limit < 1:
+        return [0.0] * returns
+    return [return_pass_count(k_val, k, p) / limit for k in range(1, returns + 1)]
+
+def monte_carlo_pass_fractions(k_val, returns, samples, seed=0):
+    """
+    Estimated per-return pass fractions from `samples` seeded window fibers (p = PRIME_MOD).
+    """
+    limit = gate_limit(k_val, PRIME_MOD)
+    times_ratio = ShoupMultiplier(k_val * pow(4, -1, PRIME_MOD), PRIME_MOD)
+    fibers = draw_window_fibers(k_val, seed, samples)
+    scratch = np.empty_like(fibers)
+    fractions = []
+    for _ in range(returns):
+        times_ratio(fibers, out=fibers, scratch=scratch)
+        fractions.append(np.count_nonzero(fibers <= limit) / samples)
+    return fractions
+
+def cross_check(k_val, returns, samples, seed=0):
+    """
+    Rows (k, exact fraction, Monte Carlo fraction, z-score of the difference).
+    """
+    exact = return_pass_fractions(k_val, returns)
+    estimate = monte_carlo_pass_fractions(k_val, returns, samples, seed)
+    rows = []
+    for k, (q, q_hat) in enumerate(zip(exact, estimate), start=1):
+        sigma = (q * (1 - q) / samples) ** 0.5
+        rows.append((k, q, q_hat, (q_hat - q) / sigma if sigma else 0.0))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exact per-return gate-pass fractions via floor sums.")
+    parser.add_argument("--k", type=int, nargs="+", default=[2, 3, 4, 5, 6, 8, 16])
+    parser.add_argument("--returns", type=int, default=5)
+    parser.add_argument("--samples", type=int, default=10**6, help="Monte Carlo fibers for the cross-check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"--- EXACT GATE-PASS FRACTIONS (p={PRIME_MOD}, Monte Carlo N={args.samples}) ---")
+    print(f"{'K':<6} | {'return':>6} | {'exact':>12} | {'Monte Carlo':>12} | {'z':>6}")
+    print("-" * 54)
+    for k_val in args.k:
+        for k, q, q_hat, z in cross_check(k_val, args.returns, args.samples, args.seed):
+            print(f"{k_val:<6} | {k:>6} | {q:>12.8f} | {q_hat:>12.8f} | {z:>6.2f}")
+        print("-" * 54)
+
+    start = time.perf_counter()
+    evaluations = 0
+    for k_val in args.k:
+        evaluations += len(return_pass_fractions(k_val, args.returns))
+    elapsed = time.perf_counter() - start
+    print(f"exact evaluation: {1e6 * elapsed / evaluations:.1f} us per (K, return)")
+
+if __name__ == "__main__":
+    main()
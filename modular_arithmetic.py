@@ -0,0 +1,86 @@
+import numpy as np
+
+# ==============================================================================
+# DIVISION-FREE MODULAR ARITHMETIC
+# Replaces the hardware divisions of the verifier hot loop:
+#   n * 2^{-1} mod p   ->  (n + (n & 1) * p) >> 1
+#   c * n mod p        ->  Shoup multiplication with a precomputed quotient constant
+#   floor(K n / p) = 0 ->  n <= (p-1)//K, a single comparison
+# All operations expect fibers already reduced to [0, p) and return results
+# bit-identical to the `%` / `//` formulation.
+# ==============================================================================
+
+SHOUP_WORD_BITS = 63  # Products must stay below 2^63 (signed int64 lanes)
+
+def halve_mod(n, p, out=None, scratch=None):
+    """
+    n * 2^{-1} mod p for odd p: even n halve exactly, odd n become (n + p) / 2.
+
+    `out` may alias `n`; `scratch` is an optional buffer shaped like `n`.
+    """
+    if out is None:
+        out = np.empty_like(n)
+    if scratch is None:
+        scratch = np.empty_like(n)
+
+    np.bitwise_and(n, 1, out=scratch)
+    np.multiply(scratch, p, out=scratch)
+    np.add(n, scratch, out=out)
+    np.right_shift(out, 1, out=out)
+    return out
+
+class ShoupMultiplier:
+    """
+    Multiplication by a fixed constant c modulo p without division (Shoup's trick).
+    `out` and `scratch` must be int64 (or uint64); `n` may be narrower.
+
+    With c' = floor(c * 2^s / p), the estimate q = (n * c') >> s is either
+    floor(c n / p) or one less, so r = c n - q p lies in [0, 2p) and a single
+    branch-free conditional subtraction finishes the reduction. s = 63 - bits(p)
+    keeps every product inside int64, which requires p < 2^31; larger moduli
+    fall back to `%`.
+    """
+
+    def __init__(self, c, p):
+        self.c = c % p
+        self.p = p
+        bits = p.bit_length()
+        self.shift = SHOUP_WORD_BITS - bits
+        if self.shift < bits:
+            self.shift = None # p too large for the int64 estimate
+            self.c_shoup = None
+        else:
+            self.c_shoup = (self.c << self.shift) // p
+
+    def __call__(self, n, out=None, scratch=None):
+        """
+        c * n mod p for n in [0, p). `out` may alias `n`.
+        """
+        if out is None:
+            out = np.empty_like(n)
+        if self.shift is None:
+            np.multiply(n, self.c, out=out, dtype=out.dtype)
+            return np.remainder(out, self.p, out=out)
+        if scratch is None:
+            scratch = np.empty_like(n)
+
+        # Quotient estimate q in {floor(cn/p) - 1, floor(cn/p)}
+        # (dtype= widens narrow fibers, e.g. uint32, before multiplying)
+        np.multiply(n, self.c_shoup, out=scratch, dtype=scratch.dtype)
+        np.right_shift(scratch, self.shift, out=scratch)
+        np.multiply(scratch, self.p, out=scratch)
+
+        # r = cn - qp in [0, 2p)
+        np.multiply(n, self.c, out=out, dtype=out.dtype)
+        np.subtract(out, scratch, out=out)
+
+        # r - p wraps to a huge unsigned value when r < p, so min() picks the reduced one
+        np.subtract(out, self.p, out=scratch)
+        np.minimum(out.view(np.uint64), scratch.view(np.uint64), out=out.view(np.uint64))
+        return out
+
+def gate_limit(k_val, p):
+    """
+    Largest n with floor(K n / p) = 0, i.e. the Safe Window bound (p-1)//K.
+    """
+    return (p - 1) // k_val
@@ -0,0 +1,151 @@
+import argparse
+import collections
+import functools
+import time
+import numpy as np
+
+from modular_arithmetic import gate_limit
+from sieve_search import SIEVE_MAX_RETURNS, sieve_survivors
+from theorem_verifier import PRIME_MOD, _add_k_arguments, _parse_k_values
+
+# ==============================================================================
+# MULTIPLICATIVE-ORDER CLASSIFICATION OF K
+# On the loop a fiber returns as n -> c n mod p with c = K * 4^{-1}, so its
+# orbit has length ord_p(c) and whether the window can carry survivors forever
+# is decided within one period. p - 1 is factored once (cached) and ord_p(c)
+# is computed for a whole array of K at once by stripping prime factors off
+# p - 1 with vectorized modular exponentiation. Each K is labelled
+#   identity      ord = 1 (K = 4): the window is invariant
+#   short-period  ord <= SIEVE_MAX_RETURNS: a sieve over one period is exact
+#   long-period   otherwise: exact only if the sieve reaches extinction
+#   closed        K >= p: the window is empty
+# so a sweep can pick the cheapest exact method per K.
+# ==============================================================================
+
+IDENTITY, SHORT_PERIOD, LONG_PERIOD, CLOSED = "identity", "short-period", "long-period", "closed"
+
+KClass = collections.namedtuple("KClass", "k_val ratio order label p")
+
+@functools.lru_cache(maxsize=None)
+def factorize(n):
+    """
+    Prime factorization of n >= 1 as ((prime, exponent), ...), by trial division.
+    """
+    factors = []
+    q = 2
+    while q * q <= n:
+        if n % q == 0:
+            exponent = 0
+            while n % q == 0:
+                n //= q
+                exponent += 1
+            factors.append((q, exponent))
+        q += 1 if q == 2 else 2
+    if n > 1:
+        factors.append((n, 1))
+    return tuple(factors)
+
+def _pow_mod(base, exponent, p):
+    """
+    Element-wise base ** exponent mod p for int64 arrays (p < 2^31 keeps products in int64).
+    """
+    result = np.ones_like(base)
+    base = base % p
+    exponent = exponent.copy()
+    while exponent.any():
+        result = np.where((exponent & 1).astype(bool), result * base % p, result)
+        base = base * base % p
+        exponent >>= 1
+    return result
+
+def multiplicative_orders(c_values, p=PRIME_MOD):
+    """
+    ord_p(c) for every c of `c_values` (units mod prime p), as an int64 array.
+    """
+    if p >= 1 << 31:
+        raise ValueError(f"p={p} too large for int64 products")
+    c = np.asarray(c_values, dtype=np.int64) % p
+    if np.any(c == 0):
+        raise ValueError("0 has no multiplicative order")
+    order = np.full(c.shape, p - 1, dtype=np.int64)
+    for q, exponent in factorize(p - 1):
+        for _ in range(exponent):
+            divisible = order % q == 0
+            candidate = np.where(divisible, order // q, order)
+            # q can be stripped while c^(order/q) is still 1
+            order = np.where(divisible & (_pow_mod(c, candidate, p) == 1), candidate, order)
+    return order
+
+def classify_k(k_values, p=PRIME_MOD, short_period_max=SIEVE_MAX_RETURNS):
+    """
+    KClass(k_val, ratio c = K/4 mod p, ord_p(c), label, p) for every K, orders computed in one batch.
+    """
+    k_values = list(k_values)
+    inv4 = pow(4, -1, p)
+    ratios = [k * inv4 % p for k in k_values]
+    open_k = [i for i, k in enumerate(k_values) if gate_limit(k, p) >= 1 and ratios[i]]
+    orders = dict(zip(open_k, multiplicative_orders([ratios[i] for i in open_k], p).tolist()))
+
+    classes = []
+    for i, k in enumerate(k_values):
+        order = orders.get(i)
+        if order is None:
+            label = CLOSED
+        elif order == 1:
+            label = IDENTITY
+        elif order <= short_period_max:
+            label = SHORT_PERIOD
+        else:
+            label = LONG_PERIOD
+        classes.append(KClass(k, ratios[i], order, label, p))
+    return classes
+
+def exact_forever_survivors(k_class, workers=0):
+    """
+    Window fibers that survive every return, or None if the cheapest exact method cannot decide.
+
+    identity: the whole window; short-period: a sieve over one full period
+    (an orbit that passes ord returns repeats forever); long-period: a sieve
+    run until extinction, which decides only if it gets there. The sieve
+    works mod PRIME_MOD, so classes computed for another prime are rejected.
+    """
+    if k_class.p != PRIME_MOD:
+        raise ValueError(f"exact_forever_survivors needs p={PRIME_MOD}, got a class for p={k_class.p}")
+    limit = gate_limit(k_class.k_val, PRIME_MOD)
+    if k_class.label == CLOSED:
+        return 0
+    if k_class.label == IDENTITY:
+        return limit
+    if k_class.label == SHORT_PERIOD:
+        return sieve_survivors(k_class.k_val, k_class.order, workers).survivors.size
+    result = sieve_survivors(k_class.k_val, None, workers)
+    return 0 if result.extinction_return is not None else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify K by the multiplicative order of K/4 mod p.")
+    _add_k_arguments(parser, "K values (default: 2..5000)")
+    parser.add_argument("--exact", action="store_true", help="also decide infinite-horizon survival per K")
+    parser.add_argument("--workers", type=int, default=0, help="sieve worker processes (0 = all cores)")
+    args = parser.parse_args(argv)
+
+    k_values = _parse_k_values(parser, args, list(range(2, 5001)))
+
+    start = time.perf_counter()
+    classes = classify_k(k_values)
+    elapsed = time.perf_counter() - start
+    counts = collections.Counter(k_class.label for k_class in classes)
+    print(f"--- ORDER CLASSIFICATION (p={PRIME_MOD}, p-1 = "
+          f"{' * '.join(f'{q}^{e}' if e > 1 else str(q) for q, e in factorize(PRIME_MOD - 1))}) ---")
+    print(f"{len(classes)} K values in {1e3 * elapsed:.1f} ms: "
+          + ", ".join(f"{counts[label]} {label}" for label in (IDENTITY, SHORT_PERIOD, LONG_PERIOD, CLOSED)))
+
+    shown = classes if len(classes) <= 20 or args.exact else [c for c in classes if c.label != LONG_PERIOD]
+    for k_class in shown:
+        line = f"K={k_class.k_val:<8} | ord {k_class.order if k_class.order else '-':<12} | {k_class.label:<12}"
+        if args.exact:
+            survivors = exact_forever_survivors(k_class, args.workers)
+            line += f" | forever: {'undecided' if survivors is None else survivors}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
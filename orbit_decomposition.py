@@ -0,0 +1,156 @@
+import argparse
+import collections
+import functools
+import math
+import numpy as np
+
+from modular_arithmetic import gate_limit
+from multiplicative_order import factorize
+from theorem_verifier import PRIME_MOD
+
+# ==============================================================================
+# EXACT INFINITE-HORIZON SURVIVORS (ORBIT DECOMPOSITION)
+# A fiber survives forever exactly when its whole orbit n, c n, c^2 n, ...
+# (c = K/4 mod p) stays inside the Safe Window [1, L]. In discrete-log
+# coordinates n = g^e (g a primitive root) multiplication by c = g^t adds t to
+# e, so the orbits are the cosets of H = <c> = <g^d>, d = gcd(t, p-1): coset j
+# is {g^(j + i d)}, j = 0..d-1, each of size |H| = (p-1)/d. The logs come from
+# Pohlig-Hellman over the cached factorization of p-1 with baby-step
+# giant-step per prime, and the cosets are checked as vectorized lanes
+# (one lane per coset, advanced by blocks of powers of g^d) that are dropped
+# at their first element outside the window. The survivor count is exact and
+# has no step horizon: it is |H| times the number of cosets inside [1, L].
+# ==============================================================================
+
+ORBIT_BLOCK_ELEMENTS = 1 << 22  # (cosets x orbit elements) cells checked per block
+
+OrbitResult = collections.namedtuple("OrbitResult", "k_val limit orbit_size orbits surviving_orbits survivors")
+
+@functools.lru_cache(maxsize=None)
+def primitive_root(p):
+    """
+    Smallest generator of the multiplicative group mod prime p.
+    """
+    factors = factorize(p - 1)
+    for g in range(2, p):
+        if all(pow(g, (p - 1) // q, p) != 1 for q, _ in factors):
+            return g
+    return 1 # p = 2
+
+@functools.lru_cache(maxsize=None)
+def _baby_steps(gamma, q, p):
+    """
+    {gamma^j: j} for j < ceil(sqrt(q)), the table of a baby-step giant-step search in <gamma> (order q).
+    """
+    m = math.isqrt(q - 1) + 1
+    table = {}
+    value = 1
+    for j in range(m):
+        table.setdefault(value, j)
+        value = value * gamma % p
+    return m, table
+
+def _subgroup_log(h, gamma, q, p):
+    """
+    x in [0, q) with gamma^x = h, for gamma of prime order q (baby-step giant-step).
+    """
+    m, table = _baby_steps(gamma, q, p)
+    giant = pow(gamma, -m, p)
+    for i in range(m):
+        if h in table:
+            return i * m + table[h]
+        h = h * giant % p
+    raise ValueError(f"{h} is not in the subgroup of order {q}")
+
+@functools.lru_cache(maxsize=None)
+def discrete_log(x, p=PRIME_MOD):
+    """
+    e in [0, p-1) with g^e = x mod p for the primitive root g (Pohlig-Hellman).
+    """
+    g, order = primitive_root(p), p - 1
+    residues, moduli = [], []
+    for q, exponent in factorize(order):
+        # Digits of e mod q^exponent in base q, each from a log in the order-q subgroup
+        gamma = pow(g, order // q, p)
+        digits = 0
+        for k in range(exponent):
+            h = pow(x * pow(g, -digits, p) % p, order // q ** (k + 1), p)
+            digits += _subgroup_log(h, gamma, q, p) * q ** k
+        residues.append(digits)
+        moduli.append(q ** exponent)
+
+    # Chinese remainder theorem
+    e = 0
+    for residue, modulus in zip(residues, moduli):
+        rest = order // modulus
+        e += residue * rest * pow(rest, -1, modulus)
+    return e % order
+
+def _powers(base, start, count, p):
+    """
+    base^start, ..., base^(start + count - 1) mod p as an int64 array, built by doubling.
+    """
+    powers = np.array([pow(base, start, p)], dtype=np.int64)
+    while powers.size < count:
+        step = pow(base, powers.size, p)
+        powers = np.concatenate([powers, powers * step % p])
+    return powers[:count]
+
+def _surviving_cosets(starts, generator, size, limit, p, block_elements):
+    """
+    How many lanes x, x g, ..., x g^(size-1) (one per start x) stay inside [1, limit].
+    """
+    lanes = starts[starts <= limit]
+    checked = 1
+    while lanes.size and checked < size:
+        block = min(size - checked, max(1, block_elements // lanes.size))
+        elements = lanes[:, None] * _powers(generator, checked, block, p)[None, :] % p
+        lanes = lanes[(elements <= limit).all(axis=1)]
+        checked += block
+    return lanes.size
+
+def orbit_survivors(k_val, p=PRIME_MOD, block_elements=ORBIT_BLOCK_ELEMENTS):
+    """
+    Exact number of window fibers whose return orbit never leaves the window; returns an OrbitResult.
+
+    Valid for prime p < 2^31 (int64 products).
+    """
+    limit = gate_limit(k_val, p)
+    c = k_val * pow(4, -1, p) % p
+    if limit < 1 or c == 0:
+        return OrbitResult(k_val, max(limit, 0), 0, 0, 0, 0) # Window is closed
+
+    d = math.gcd(discrete_log(c, p), p - 1)
+    orbit_size = (p - 1) // d
+    if orbit_size == 1:
+        return OrbitResult(k_val, limit, 1, d, limit, limit) # c = 1: every fiber is a fixed point
+    if orbit_size > limit:
+        return OrbitResult(k_val, limit, orbit_size, d, 0, 0) # No orbit fits in the window
+
+    g = primitive_root(p)
+    generator = pow(g, d, p)
+    surviving = 0
+    lanes_per_chunk = max(1, block_elements)
+    for first in range(0, d, lanes_per_chunk):
+        starts = _powers(g, first, min(lanes_per_chunk, d - first), p) # Coset representatives g^j
+        surviving += _surviving_cosets(starts, generator, orbit_size, limit, p, block_elements)
+    return OrbitResult(k_val, limit, orbit_size, d, surviving, surviving * orbit_size)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exact infinite-horizon survivors via orbit decomposition.")
+    parser.add_argument("--k", type=int, nargs="+", default=[2, 3, 4, 5, 6, 8, 16])
+    parser.add_argument("--p", type=int, default=PRIME_MOD, help="prime modulus (< 2^31)")
+    args = parser.parse_args(argv)
+
+    g = primitive_root(args.p)
+    print(f"--- ORBIT DECOMPOSITION (p={args.p}, g={g}, no step horizon) ---")
+    print(f"{'K-Factor':<10} | {'orbit size':>12} | {'orbits':>12} | {'inside':>10} | {'survivors':>12}")
+    print("-" * 68)
+    for k in args.k:
+        result = orbit_survivors(k, args.p)
+        status = "  [INVARIANT]" if result.survivors == result.limit > 0 else ""
+        print(f"K={k:<8} | {result.orbit_size:>12} | {result.orbits:>12} | {result.surviving_orbits:>10} | "
+              f"{result.survivors:>12}{status}")
+
+if __name__ == "__main__":
+    main()
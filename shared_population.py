@@ -0,0 +1,244 @@
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+from multiprocessing import shared_memory
+import numpy as np
+
+from modular_arithmetic import ShoupMultiplier, gate_limit
+from theorem_verifier import (BATCH_SIZE, PRIME_MOD, TEST_STEPS, WIDEN_BLOCK, WindowResult, _format_sweep_row,
+                              _summarize_exits, draw_window_fibers)
+
+# ==============================================================================
+# SHARED-MEMORY POPULATION
+# The population state lives in multiprocessing.shared_memory blocks that
+# worker processes map zero-copy and advance in disjoint slices. State is kept
+# at return boundaries (every live particle at w=1), so it is just
+#   fibers:     n at the current return (int64, or uint32 in compact mode)
+#   exit_steps: step at which each particle was expelled, -1 while alive.
+# The coordinator reads survival statistics and writes checkpoints straight
+# from the shared arrays, without serializing the state between processes.
+# ==============================================================================
+
+SLICES_PER_WORKER = 4  # Slices handed out per worker and epoch, for load balance
+
+def _attach_block(name):
+    """
+    Map an existing block without taking ownership: only the creator unlinks.
+
+    Pool workers share the coordinator's resource tracker, which already
+    tracks the block, so before Python 3.13 (no track=False) the implicit
+    re-registration on attach is harmless.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+class SharedPopulation:
+    """
+    Particle arrays backed by shared memory blocks.
+
+    Create one in the coordinator with SharedPopulation.create(size), hand
+    `descriptor` to workers, and rebuild it there with SharedPopulation.attach.
+    The creator unlinks the blocks on close().
+    """
+
+    def __init__(self, size, fiber_dtype, fiber_block, exit_block, owner):
+        self.size = size
+        self.fiber_dtype = np.dtype(fiber_dtype)
+        self._blocks = (fiber_block, exit_block)
+        self._owner = owner
+        self.fibers = np.ndarray(size, dtype=self.fiber_dtype, buffer=fiber_block.buf)
+        self.exit_steps = np.ndarray(size, dtype=np.int32, buffer=exit_block.buf)
+
+    @classmethod
+    def create(cls, size, fiber_dtype=np.int64):
+        fiber_dtype = np.dtype(fiber_dtype)
+        fiber_block = shared_memory.SharedMemory(create=True, size=max(size * fiber_dtype.itemsize, 1))
+        exit_block = shared_memory.SharedMemory(create=True, size=max(size * 4, 1))
+        population = cls(size, fiber_dtype, fiber_block, exit_block, owner=True)
+        population.exit_steps.fill(-1)
+        return population
+
+    @classmethod
+    def attach(cls, descriptor):
+        size, fiber_dtype, fiber_name, exit_name = descriptor
+        return cls(size, fiber_dtype, _attach_block(fiber_name), _attach_block(exit_name), owner=False)
+
+    @property
+    def descriptor(self):
+        """
+        Picklable handle: (size, fiber dtype, fiber block name, exit block name).
+        """
+        fiber_block, exit_block = self._blocks
+        return (self.size, self.fiber_dtype.str, fiber_block.name, exit_block.name)
+
+    def alive(self):
+        return int(np.count_nonzero(self.exit_steps < 0))
+
+    def save_checkpoint(self, path, **metadata):
+        """
+        Write the state (plus metadata such as k_val and gates_done) to an .npz file.
+        """
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, fibers=self.fibers, exit_steps=self.exit_steps, **metadata)
+        os.replace(tmp_path, path)
+
+    def load_checkpoint(self, path):
+        """
+        Restore the state from save_checkpoint; returns the stored metadata.
+
+        Raises ValueError, leaving the state untouched, if the stored arrays
+        do not match this population's size and fiber dtype.
+        """
+        with np.load(path) as data:
+            metadata = {key: data[key].item() for key in data.files if key not in ("fibers", "exit_steps")}
+            fibers, exit_steps = data["fibers"], data["exit_steps"]
+            if fibers.dtype != self.fiber_dtype or fibers.size != self.size or exit_steps.size != self.size:
+                raise ValueError(f"Checkpoint {path} does not fit a population of {self.size} "
+                                 f"{self.fiber_dtype} fibers: {metadata}")
+            self.fibers[:] = fibers
+            self.exit_steps[:] = exit_steps
+            return metadata
+
+    def close(self):
+        # Views must go before the buffers they point into
+        self.fibers = self.exit_steps = None
+        for block in self._blocks:
+            block.close()
+            if self._owner:
+                block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _advance_slice(descriptor, start, stop, k_val, first_gate, last_gate):
+    """
+    Worker task: run gates [first_gate, last_gate) on population[start:stop] in place.
+
+    Gate g is step 3g of the per-step dynamics; expelled particles get that step
+    as exit step, and every fiber then moves on by the return map R_K. The
+    slice is advanced WIDEN_BLOCK particles at a time through all gates: int64
+    fibers are updated directly in shared memory, uint32 fibers through one
+    block-sized int64 buffer, so a task's private memory does not grow with
+    the slice.
+    """
+    population = SharedPopulation.attach(descriptor)
+    fibers = exit_steps = wide = None
+    try:
+        limit = gate_limit(k_val, PRIME_MOD)
+        times_ratio = ShoupMultiplier(k_val * pow(4, PRIME_MOD - 2, PRIME_MOD), PRIME_MOD)
+        block_size = min(stop - start, WIDEN_BLOCK)
+        scratch = np.empty(block_size, dtype=np.int64)
+        widened = None if population.fiber_dtype == np.int64 else np.empty_like(scratch)
+        expelled = np.empty(block_size, dtype=bool)
+        alive = np.empty(block_size, dtype=bool)
+
+        for block_start in range(start, stop, WIDEN_BLOCK):
+            fibers = population.fibers[block_start:min(block_start + WIDEN_BLOCK, stop)]
+            exit_steps = population.exit_steps[block_start:block_start + fibers.size]
+            size = fibers.size
+            wide = fibers if widened is None else widened[:size]
+            if widened is not None:
+                np.copyto(wide, fibers)
+
+            for gate in range(first_gate, last_gate):
+                np.greater(wide, limit, out=expelled[:size])
+                np.less(exit_steps, 0, out=alive[:size])
+                np.logical_and(expelled[:size], alive[:size], out=expelled[:size])
+                exit_steps[expelled[:size]] = 3 * gate
+                times_ratio(wide, out=wide, scratch=scratch[:size])
+
+            if widened is not None:
+                np.copyto(fibers, wide, casting="unsafe")
+    finally:
+        fibers = exit_steps = wide = None # Views must go before the blocks close
+        population.close()
+
+def run_shared_window_invariance(k_val, batch_size=BATCH_SIZE, steps=TEST_STEPS, workers=0,
+                                 epoch_gates=5, compact_dtypes=False, checkpoint_path=None,
+                                 resume=False, on_epoch=None, seed=None):
+    """
+    Safe Window test with the population in shared memory, advanced by a process pool.
+
+    Each epoch hands disjoint slices to the workers for `epoch_gates` returns;
+    between epochs the coordinator reads the survivor count straight from the
+    shared arrays, checkpoints the state if checkpoint_path is set (resume=True
+    continues from that file) and calls on_epoch(gates_done, alive). The run
+    ends at the horizon or on extinction. workers=0 uses all cores.
+    The particles are those of the seeded draw (see draw_window_fibers);
+    unseeded runs draw a fresh seed.
+
+    Returns the same WindowResult as simulate_window_invariance for the same seed.
+    """
+    limit = gate_limit(k_val, PRIME_MOD)
+    if limit < 1:
+        return WindowResult(k_val, batch_size, steps, 0, 0, None) # Window is closed (K >= p)
+
+    gates = (steps + 2) // 3
+    workers = workers or os.cpu_count() or 1
+    fiber_dtype = np.dtype(np.uint32 if compact_dtypes else np.int64)
+    run = {"k_val": k_val, "steps": steps, "batch_size": batch_size, "fiber_dtype": fiber_dtype.str}
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+
+    with SharedPopulation.create(batch_size, fiber_dtype) as population:
+        gates_done = 0
+        if resume and checkpoint_path and os.path.exists(checkpoint_path):
+            metadata = population.load_checkpoint(checkpoint_path)
+            if any(metadata.get(key) != value for key, value in run.items()):
+                raise ValueError(f"Checkpoint {checkpoint_path} is for another run: {metadata}")
+            gates_done = metadata["gates_done"]
+        else:
+            draw_window_fibers(k_val, seed, batch_size, compact_dtypes=compact_dtypes, out=population.fibers)
+
+        slice_size = max(1, -(-batch_size // (workers * SLICES_PER_WORKER)))
+        # Spawned, not forked: an earlier numba run may have started compiled-kernel threads here
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            while gates_done < gates and population.alive() > 0:
+                epoch_end = min(gates, gates_done + epoch_gates)
+                tasks = [pool.submit(_advance_slice, population.descriptor, start,
+                                     min(start + slice_size, batch_size), k_val, gates_done, epoch_end)
+                         for start in range(0, batch_size, slice_size)]
+                for task in tasks:
+                    task.result()
+                gates_done = epoch_end
+
+                if checkpoint_path:
+                    population.save_checkpoint(checkpoint_path, gates_done=gates_done, **run)
+                if on_epoch is not None:
+                    on_epoch(gates_done, population.alive())
+
+        survivors, last_exit, steps_run = _summarize_exits(population.exit_steps, steps, 0)
+
+    extinction_step = last_exit if survivors == 0 and last_exit >= 0 else None
+    return WindowResult(k_val, batch_size, steps, steps_run, survivors, extinction_step)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Safe Window test with the population in shared memory.")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--steps", type=int, default=TEST_STEPS)
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (0 = all cores)")
+    parser.add_argument("--epoch-gates", type=int, default=5, help="returns per epoch between checkpoints")
+    parser.add_argument("--compact", action="store_true", help="store fibers as uint32")
+    parser.add_argument("--checkpoint", help="state file (.npz), resumed with --resume")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--seed", type=int, help="seed for a reproducible draw")
+    args = parser.parse_args(argv)
+
+    def progress(gates_done, alive):
+        print(f"return {gates_done}: {alive}/{args.batch_size} alive", flush=True)
+
+    print(f"--- SHARED-MEMORY VERIFICATION (K={args.k}, N={args.batch_size}, {args.steps} steps) ---")
+    result = run_shared_window_invariance(args.k, args.batch_size, args.steps, args.workers, args.epoch_gates,
+                                          args.compact, args.checkpoint, args.resume, progress, args.seed)
+    print(_format_sweep_row(args.k, result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import argparse
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import numpy as np
+
+from modular_arithmetic import ShoupMultiplier, gate_limit
+from theorem_verifier import PRIME_MOD, TEST_STEPS
+
+# ==============================================================================
+# EXACT SIEVE SURVIVOR SEARCH
+# Starts from the entire Safe Window [1, L], L = (p-1)//K, instead of a sample.
+# At every return the candidates are mapped by R_K(n) = (K/4) n mod p and only
+# those still inside the window (the carry gate) are kept, compacted in place.
+# About L/p ~ 1/K of the candidates pass each return, so after the first pass
+# over the window the remaining work is a geometric tail. Only the current
+# fibers are stored: a survivor of h returns is mapped back to its starting
+# fiber with (K/4)^-h at the end. The result is the exact set of starting
+# fibers that survive h returns; an empty set proves extinction.
+# ==============================================================================
+
+SIEVE_CHUNK_SIZE = 1 << 22  # Window fibers per task (~70 MB of working set)
+SIEVE_MAX_RETURNS = 10_000  # Cap for the run-until-extinct mode
+DEFAULT_RETURNS = (TEST_STEPS + 2) // 3 - 1  # Returns inside the verifier's horizon (gate 0 is the start)
+
+class SieveResult(collections.namedtuple("SieveResult", "k_val limit returns counts survivors")):
+    """
+    counts[j] fibers of [1, limit] pass the gate at each of the first j returns
+    (counts[0] = limit); `survivors` are the sorted starting fibers passing all `returns`.
+    """
+    __slots__ = ()
+
+    @property
+    def extinction_return(self):
+        """
+        First return no fiber of the window passes, None if some survive them all.
+        """
+        empty = np.flatnonzero(self.counts == 0)
+        return int(empty[0]) if empty.size else None
+
+def _ratio(k_val):
+    return k_val * pow(4, PRIME_MOD - 2, PRIME_MOD) % PRIME_MOD # K/4 mod p
+
+def _sieve_chunk(k_val, first, last, returns):
+    """
+    Per-return pass counts for fibers first..last and the starting fibers passing all `returns`.
+    """
+    limit = gate_limit(k_val, PRIME_MOD)
+    times_ratio = ShoupMultiplier(_ratio(k_val), PRIME_MOD)
+    fibers = np.arange(first, last + 1, dtype=np.int64)
+    scratch = np.empty_like(fibers)
+    counts = np.zeros(returns + 1, dtype=np.int64)
+    counts[0] = fibers.size
+
+    applied = 0
+    while applied < returns and fibers.size:
+        times_ratio(fibers, out=fibers, scratch=scratch[:fibers.size])
+        fibers = fibers[fibers <= limit]
+        applied += 1
+        counts[applied] = fibers.size
+
+    # Back to the starting fibers: n0 = (K/4)^-applied * n mod p
+    back = ShoupMultiplier(pow(_ratio(k_val), -applied, PRIME_MOD), PRIME_MOD)
+    return counts, np.sort(back(fibers, scratch=scratch[:fibers.size]))
+
+def sieve_survivors(k_val, returns=DEFAULT_RETURNS, workers=0, chunk_size=SIEVE_CHUNK_SIZE):
+    """
+    Exact survivors of `returns` returns from the whole Safe Window; returns a SieveResult.
+
+    returns=None runs until no candidate is left (at most SIEVE_MAX_RETURNS).
+    Window chunks are sieved on a spawned process pool (workers=0 = all cores).
+    """
+    limit = gate_limit(k_val, PRIME_MOD)
+    horizon = SIEVE_MAX_RETURNS if returns is None else returns
+    counts = np.zeros(horizon + 1, dtype=np.int64)
+    if limit < 1:
+        return SieveResult(k_val, 0, horizon, counts, np.empty(0, dtype=np.int64))
+
+    workers = workers or os.cpu_count() or 1
+    spans = [(first, min(first + chunk_size - 1, limit)) for first in range(1, limit + 1, chunk_size)]
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        parts = list(pool.map(_sieve_chunk, *zip(*[(k_val, first, last, horizon) for first, last in spans])))
+
+    for part_counts, _ in parts:
+        counts += part_counts
+    survivors = np.concatenate([part_survivors for _, part_survivors in parts])
+    if returns is None:
+        empty = np.flatnonzero(counts == 0)
+        horizon = int(empty[0]) if empty.size else horizon
+        counts = counts[:horizon + 1]
+    return SieveResult(k_val, limit, horizon, counts, survivors)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exact survivors of the whole Safe Window for K != 4.")
+    parser.add_argument("--k", type=int, nargs="+", default=[2, 3, 5, 6, 8, 16])
+    parser.add_argument("--returns", type=int, default=DEFAULT_RETURNS,
+                        help="returns to survive (0 or less: run until extinct)")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (0 = all cores)")
+    args = parser.parse_args(argv)
+    returns = args.returns if args.returns > 0 else None
+
+    print(f"--- EXACT SIEVE SEARCH (whole window, {'until extinct' if returns is None else f'{returns} returns'}) ---")
+    for k in args.k:
+        result = sieve_survivors(k, returns, args.workers)
+        trail = " -> ".join(str(count) for count in result.counts[:8])
+        if len(result.counts) > 8:
+            trail += " -> ..."
+        print(f"K={k:<8} | {trail}")
+        if result.extinction_return is not None:
+            print(f"{'':<10} | NO SURVIVORS: every fiber of [1, {result.limit}] fails by return "
+                  f"{result.extinction_return}")
+        else:
+            shown = ", ".join(str(n) for n in result.survivors[:10])
+            print(f"{'':<10} | {result.survivors.size} survivors of {result.returns} returns: {shown}"
+                  f"{', ...' if result.survivors.size > 10 else ''}")
+
+if __name__ == "__main__":
+    main()
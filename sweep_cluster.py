@@ -0,0 +1,327 @@
+import argparse
+import collections
+import json
+import multiprocessing
+import socket
+import socketserver
+import threading
+import time
+
+import numba_backend
+from sweep_scheduler import SWEEP_CHUNK_SIZE, _sweep_tasks
+from theorem_verifier import (BATCH_SIZE, DEFAULT_K_VALUES, PRIME_MOD, TEST_STEPS, WindowResult, _add_k_arguments,
+                              _format_sweep_row, _parse_k_values, merge_window_results, simulate_window_invariance)
+
+# ==============================================================================
+# MULTI-NODE SWEEP COORDINATOR
+# One (K, p, seed) sweep spread over several machines. The coordinator cuts
+# every K into (K, chunk) tasks and leases them to workers over TCP; the
+# protocol is one JSON object per line:
+#   worker -> {"type": "request"}                 coordinator -> task | wait | done
+#   worker -> {"type": "result", "task": ..., "result": {...}}      -> ack
+#   worker -> {"type": "error", "task": ..., "message": ...}        -> ack
+# Malformed messages and results that cannot belong to their task get a
+# reject reply (a rejected result is re-queued) and the connection stays up.
+# A task is re-queued when its worker reports an error or disconnects, and
+# re-issued to another worker when its lease runs out (slow worker); the
+# first result to arrive wins. Particles come from the seeded draw, which
+# depends only on (seed, K, particle index) (see draw_window_fibers), so a
+# retried task reproduces the same particles and the per-K merge is exact
+# however the tasks were scheduled.
+# ==============================================================================
+
+CLUSTER_PORT = 5007  # Default coordinator port
+LEASE_SECONDS = 300.0  # A task not reported back within this is handed out again
+MAX_ATTEMPTS = 5  # Leases per task before the sweep is abandoned
+WAIT_SECONDS = 0.5  # Back-off sent to idle workers while leases are outstanding
+CONNECT_TIMEOUT = 30.0  # How long a worker keeps retrying to reach the coordinator
+
+def _send(stream, message):
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+def _receive(stream):
+    line = stream.readline()
+    return json.loads(line) if line else None
+
+class _SweepState:
+    """
+    Task queue, leases and collected results, shared by all connection handlers.
+    """
+
+    def __init__(self, tasks, lease_seconds, max_attempts):
+        self.tasks = {(k_val, chunk_index): size for k_val, chunk_index, size in tasks}
+        self.pending = collections.deque(self.tasks)
+        self.leases = {}  # (k_val, chunk_index) -> (deadline, connection id)
+        self.attempts = collections.Counter()
+        self.parts = {}
+        self.error = None
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def lease(self, connection):
+        """
+        Next task key for `connection`, "wait" if only leased tasks remain, None when done.
+        """
+        with self.lock:
+            if self.finished.is_set():
+                return None
+            now = time.monotonic()
+            if self.pending:
+                key = self.pending.popleft()
+            else:
+                expired = [key for key, (deadline, _) in self.leases.items() if deadline < now]
+                if not expired:
+                    return "wait"
+                key = expired[0] # Slow worker: hand a copy to someone else
+            self.attempts[key] += 1
+            if self.attempts[key] > self.max_attempts:
+                self.error = f"task {key} failed {self.max_attempts} times"
+                self.finished.set()
+                return None
+            self.leases[key] = (now + self.lease_seconds, connection)
+            return key
+
+    def complete(self, key, result):
+        with self.lock:
+            self.leases.pop(key, None)
+            self.parts.setdefault(key, result)
+            if len(self.parts) == len(self.tasks):
+                self.finished.set()
+
+    def retry(self, key):
+        with self.lock:
+            if key in self.leases and key not in self.parts:
+                del self.leases[key]
+                self.pending.append(key)
+
+    def release(self, connection):
+        """
+        Re-queue every task still leased to a connection that went away.
+        """
+        with self.lock:
+            lost = [key for key, (_, owner) in self.leases.items() if owner == connection]
+            for key in lost:
+                del self.leases[key]
+                if key not in self.parts:
+                    self.pending.append(key)
+
+class _WorkerHandler(socketserver.StreamRequestHandler):
+    def _task_key(self, message):
+        key = tuple(message["task"])
+        if key not in self.server.state.tasks:
+            raise ValueError(f"unknown task {message['task']!r}")
+        return key
+
+    def _check_result(self, key, fields):
+        """
+        WindowResult from a worker's fields; ValueError unless it can be this task's outcome.
+        """
+        result = WindowResult(**fields)
+        k_val, _ = key
+        batch_size, steps = self.server.state.tasks[key], self.server.steps
+        counts = (result.survivors, result.steps_run)
+        if (result.k_val, result.batch_size, result.steps) != (k_val, batch_size, steps) \
+                or not all(type(count) is int for count in counts) \
+                or not (0 <= result.survivors <= batch_size and 0 <= result.steps_run <= steps) \
+                or result.extinction_step is not None and (type(result.extinction_step) is not int
+                                                           or result.survivors
+                                                           or not 0 <= result.extinction_step < steps):
+            raise ValueError(f"result {fields!r} does not fit task {list(key)}")
+        return result
+
+    def _reply(self, state, connection, message):
+        """
+        Answer to one message (None ends the connection); malformed messages raise.
+        """
+        kind = message["type"]
+        if kind == "request":
+            key = state.lease(connection)
+            if key is None:
+                return None
+            if key == "wait":
+                return {"type": "wait", "seconds": WAIT_SECONDS}
+            k_val, chunk_index = key
+            return {"type": "task", "task": [k_val, chunk_index], "prime": PRIME_MOD,
+                    "seed": self.server.seed, "offset": chunk_index * self.server.chunk_size,
+                    "batch_size": state.tasks[key], "steps": self.server.steps}
+        if kind == "result":
+            key = self._task_key(message)
+            try:
+                result = self._check_result(key, message["result"])
+            except (KeyError, TypeError, ValueError):
+                state.retry(key) # Run it again rather than wait for the lease to expire
+                raise
+            state.complete(key, result)
+            return {"type": "ack"}
+        if kind == "error":
+            state.retry(self._task_key(message))
+            return {"type": "ack"}
+        raise ValueError(f"unknown message type {kind!r}")
+
+    def handle(self):
+        state = self.server.state
+        connection = id(self)
+        try:
+            while True:
+                try:
+                    message = _receive(self.rfile)
+                    if message is None:
+                        break
+                    reply = self._reply(state, connection, message)
+                except (KeyError, TypeError, ValueError) as exc:
+                    reply = {"type": "reject", "message": repr(exc)} # Bad message: refuse it, keep serving
+                if reply is None:
+                    _send(self.wfile, {"type": "done"})
+                    break
+                _send(self.wfile, reply)
+        except OSError:
+            pass # Worker went away; its leases are released below
+        finally:
+            state.release(connection)
+
+class _CoordinatorServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+class SweepCoordinator:
+    """
+    TCP coordinator for one sweep; serve() blocks until every task is back.
+
+    Bind to port 0 for an ephemeral port and read it back from `address`.
+    The default host only accepts local workers; bind to "0.0.0.0" (or a
+    specific interface) to serve other machines.
+    """
+
+    def __init__(self, k_values, batch_size=BATCH_SIZE, chunk_size=SWEEP_CHUNK_SIZE, steps=TEST_STEPS,
+                 seed=0, host="127.0.0.1", port=CLUSTER_PORT, lease_seconds=LEASE_SECONDS,
+                 max_attempts=MAX_ATTEMPTS):
+        self.k_values = list(k_values)
+        self.state = _SweepState(_sweep_tasks(self.k_values, batch_size, chunk_size), lease_seconds,
+                                 max_attempts)
+        self.server = _CoordinatorServer((host, port), _WorkerHandler)
+        self.server.state = self.state
+        self.server.seed = seed
+        self.server.steps = steps
+        self.server.chunk_size = chunk_size
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def serve(self):
+        """
+        Hand out tasks until the sweep is complete; returns {k: merged WindowResult}.
+        """
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            self.state.finished.wait()
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.state.error:
+            raise RuntimeError(f"Sweep abandoned: {self.state.error}")
+
+        parts = collections.defaultdict(list)
+        for (k_val, chunk_index), result in sorted(self.state.parts.items()):
+            parts[k_val].append(result)
+        return {k: merge_window_results(parts[k]) for k in self.k_values}
+
+def run_task(task, engine="auto"):
+    """
+    Worker body for one task descriptor: the chunk's seeded Safe Window run.
+    """
+    if task["prime"] != PRIME_MOD:
+        raise ValueError(f"Worker is built for p={PRIME_MOD}, task asks for p={task['prime']}")
+    k_val, _ = task["task"]
+    return simulate_window_invariance(k_val, engine=engine, batch_size=task["batch_size"], steps=task["steps"],
+                                      seed=task["seed"], offset=task["offset"])
+
+def _connect(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return socket.create_connection((host, port))
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(WAIT_SECONDS)
+
+def run_worker(host, port=CLUSTER_PORT, engine="auto", connect_timeout=CONNECT_TIMEOUT):
+    """
+    Pull and run tasks from the coordinator at host:port until it reports done.
+
+    Returns the number of tasks completed by this worker.
+    """
+    done = 0
+    with _connect(host, port, connect_timeout) as sock, sock.makefile("rwb") as stream:
+        while True:
+            _send(stream, {"type": "request"})
+            message = _receive(stream)
+            if message is None or message["type"] == "done":
+                return done
+            if message["type"] == "wait":
+                time.sleep(message["seconds"])
+                continue
+            try:
+                result = run_task(message, engine)
+            except Exception as exc:
+                _send(stream, {"type": "error", "task": message["task"], "message": repr(exc)})
+            else:
+                _send(stream, {"type": "result", "task": message["task"], "result": result._asdict()})
+                done += 1
+            if _receive(stream) is None:
+                return done
+
+def _local_worker(port):
+    """
+    Worker process for --local-workers: it shares the host, so one compiled-kernel thread each.
+    """
+    numba_backend.pin_single_thread()
+    run_worker("127.0.0.1", port)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-node K sweep over a TCP work protocol.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    coordinate = commands.add_parser("coordinate", help="serve the sweep's tasks")
+    _add_k_arguments(coordinate)
+    coordinate.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    coordinate.add_argument("--chunk-size", type=int, default=SWEEP_CHUNK_SIZE)
+    coordinate.add_argument("--seed", type=int, default=0)
+    coordinate.add_argument("--host", default="127.0.0.1", help="bind address (0.0.0.0 serves remote workers)")
+    coordinate.add_argument("--port", type=int, default=CLUSTER_PORT)
+    coordinate.add_argument("--lease", type=float, default=LEASE_SECONDS, help="seconds before a task is re-issued")
+    coordinate.add_argument("--local-workers", type=int, default=0, help="also start N workers on this host")
+
+    work = commands.add_parser("work", help="run tasks for a coordinator")
+    work.add_argument("--host", default="127.0.0.1")
+    work.add_argument("--port", type=int, default=CLUSTER_PORT)
+    work.add_argument("--engine", default="auto")
+    args = parser.parse_args(argv)
+
+    if args.command == "work":
+        print(f"worker finished {run_worker(args.host, args.port, args.engine)} tasks")
+        return
+
+    k_values = _parse_k_values(coordinate, args, DEFAULT_K_VALUES)
+    coordinator = SweepCoordinator(k_values, args.batch_size, args.chunk_size, seed=args.seed,
+                                   host=args.host, port=args.port, lease_seconds=args.lease)
+    port = coordinator.address[1]
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_local_worker, args=(port,)) for _ in range(args.local_workers)]
+    for worker in workers:
+        worker.start()
+
+    print(f"--- CLUSTER SWEEP (N={args.batch_size}, seed {args.seed}, port {port}) ---")
+    results = coordinator.serve()
+    for k in k_values:
+        print(_format_sweep_row(k, results[k]))
+    for worker in workers:
+        worker.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import argparse
+import collections
+import multiprocessing
+import os
+import queue
+import time
+
+import numba_backend
+from theorem_verifier import (BATCH_SIZE, DEFAULT_K_VALUES, TEST_STEPS, _add_k_arguments, _format_sweep_row,
+                              _parse_k_values, merge_window_results, select_engine, simulate_window_invariance)
+
+# ==============================================================================
+# WORK-STEALING SWEEP SCHEDULER
+# A K sweep is very uneven: K=4 runs every step at full population while K!=4
+# tasks go extinct within a few cycles. Instead of a static split, every K is
+# cut into (K, chunk) tasks on one shared queue; idle workers pull the next
+# task as soon as they finish, and each task body is a
+# simulate_window_invariance run on its chunk. Per-K results are merged exactly.
+# ==============================================================================
+
+SWEEP_CHUNK_SIZE = 25_000  # Particles per (K, chunk) task
+
+class WorkerStats(collections.namedtuple("WorkerStats", "worker_id tasks busy_seconds wall_seconds")):
+    __slots__ = ()
+
+    @property
+    def utilization(self):
+        """
+        Fraction of the sweep's wall time this worker spent running tasks.
+        """
+        return self.busy_seconds / self.wall_seconds if self.wall_seconds else 0.0
+
+SweepReport = collections.namedtuple("SweepReport", "results workers wall_seconds")
+
+def _sweep_tasks(k_values, batch_size, chunk_size):
+    """
+    (k_val, chunk_index, chunk_size) tasks, chunk-major so every K is in flight early.
+    """
+    chunks = -(-batch_size // chunk_size)
+    for chunk_index in range(chunks):
+        size = min(chunk_size, batch_size - chunk_index * chunk_size)
+        for k_val in k_values:
+            yield (k_val, chunk_index, size)
+
+def _worker(worker_id, tasks, results, engine, tile_size, steps, seed, chunk_size):
+    """
+    Pull tasks until the stop marker, then report busy time and task count.
+    """
+    numba_backend.pin_single_thread() # One worker per core already
+    busy, done = 0.0, 0
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        k_val, chunk_index, size = task
+        start = time.perf_counter()
+        result = simulate_window_invariance(k_val, engine=engine, batch_size=size, steps=steps,
+                                            tile_size=tile_size, seed=seed, offset=chunk_index * chunk_size)
+        busy += time.perf_counter() - start
+        done += 1
+        results.put(("result", k_val, chunk_index, result))
+    results.put(("stats", worker_id, done, busy))
+
+def run_work_stealing_sweep(k_values, batch_size=BATCH_SIZE, chunk_size=SWEEP_CHUNK_SIZE, workers=0,
+                            engine="auto", steps=TEST_STEPS, seed=None):
+    """
+    Sweep `k_values` with `batch_size` particles each over a dynamically scheduled pool.
+
+    Returns a SweepReport: {k: merged WindowResult}, per-worker WorkerStats and
+    the sweep's wall time. workers=0 uses all cores. With a seed the merged
+    results do not depend on the chunk size or the number of workers.
+    """
+    k_values = list(k_values)
+    workers = workers or os.cpu_count() or 1
+    tile_size = None
+    if engine == "auto":
+        engine, tile_size = select_engine(chunk_size, steps)
+
+    # Spawned workers: the parent may already run compiled-kernel threads (e.g. after
+    # auto-calibration), and forking a threaded process can deadlock
+    context = multiprocessing.get_context("spawn")
+    tasks, results = context.Queue(), context.Queue()
+    expected = 0
+    for task in _sweep_tasks(k_values, batch_size, chunk_size):
+        tasks.put(task)
+        expected += 1
+    for _ in range(workers):
+        tasks.put(None)
+
+    start = time.perf_counter()
+    processes = [context.Process(target=_worker,
+                                 args=(worker_id, tasks, results, engine, tile_size, steps, seed, chunk_size))
+                 for worker_id in range(workers)]
+    for process in processes:
+        process.start()
+
+    parts = collections.defaultdict(dict)
+    stats = {}
+    while expected or len(stats) < workers:
+        try:
+            message = results.get(timeout=1.0)
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                raise RuntimeError("sweep workers exited before finishing their tasks")
+            continue
+        if message[0] == "result":
+            _, k_val, chunk_index, result = message
+            parts[k_val][chunk_index] = result
+            expected -= 1
+        else:
+            _, worker_id, done, busy = message
+            stats[worker_id] = (done, busy)
+    wall = time.perf_counter() - start
+
+    for process in processes:
+        process.join()
+
+    merged = {k: merge_window_results(parts[k][i] for i in sorted(parts[k])) for k in k_values}
+    worker_stats = [WorkerStats(worker_id, done, busy, wall) for worker_id, (done, busy) in sorted(stats.items())]
+    return SweepReport(merged, worker_stats, wall)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="K sweep with a work-stealing process pool.")
+    _add_k_arguments(parser)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--chunk-size", type=int, default=SWEEP_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (0 = all cores)")
+    parser.add_argument("--engine", default="auto")
+    parser.add_argument("--seed", type=int, help="seed for a reproducible draw")
+    args = parser.parse_args(argv)
+
+    k_values = _parse_k_values(parser, args, DEFAULT_K_VALUES)
+    report = run_work_stealing_sweep(k_values, args.batch_size, args.chunk_size, args.workers, args.engine,
+                                     seed=args.seed)
+
+    print(f"--- WORK-STEALING SWEEP (N={args.batch_size}, chunks of {args.chunk_size}) ---")
+    for k in k_values:
+        print(_format_sweep_row(k, report.results[k]))
+    print("-" * 65)
+    for worker in report.workers:
+        print(f"worker {worker.worker_id:<3} | {worker.tasks:>5} tasks | busy {worker.busy_seconds:8.3f}s"
+              f" | utilization {100 * worker.utilization:5.1f}%")
+    print(f"wall time {report.wall_seconds:.3f}s")
+
+if __name__ == "__main__":
+    main()
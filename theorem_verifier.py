@@ -1,6 +1,19 @@
+import argparse
+import collections
+import concurrent.futures
+import functools
+import glob
+import json
+import multiprocessing
+import os
+import platform
 import sys
+import time
 import numpy as np
 
+import numba_backend
+from modular_arithmetic import ShoupMultiplier, gate_limit, halve_mod
+
 # ==============================================================================
 # THEOREM VERIFIER (V3.1 - GOLDEN STANDARD)
 # Tests the invariance of the "Safe Window" lemma directly.
@@ -11,61 +24,799 @@ PRIME_MOD = 1_000_000_007
 BATCH_SIZE = 100_000
 TEST_STEPS = 60   # 20 full cycles (Sufficient for sieve extinction)
 
-def verify_window_invariance(k_val):
+COMPACT_THRESHOLD = 0.5  # Compact once less than half the tracked batch is alive
+JUMP_BLOCK_ELEMENTS = 1 << 22  # (particles x gates) cells per jump-ahead block (~32 MB)
+WIDEN_BLOCK = 1 << 16  # uint32 fibers widened to int64 this many at a time (compact storage)
+TILE_BYTES_PER_PARTICLE = 64  # Working set per particle (state + scratch) used to size tiles
+DEFAULT_CACHE_BYTES = 1 << 20  # Assumed L2 size when it cannot be detected
+SCALAR_MAX_BATCH = 256  # The pure-Python engine is only a candidate for batches this small
+CALIBRATION_WORK = 1 << 22  # Particle-steps per calibration run of a candidate engine
+CALIBRATION_CACHE_ENV = "K4_ENGINE_CACHE"  # Overrides the calibration cache file location
+THREAD_CHUNKS_PER_WORKER = 4  # Chunks queued per thread, so uneven chunks still balance
+RANDOM_CHUNK_SIZE = 1 << 16  # Particles per counter-based random stream of a seeded run
+MULTI_K_BLOCK_ELEMENTS = 1 << 22  # (K values x particles) cells per block of the multi-K kernel
+
+class WindowResult(collections.namedtuple(
+        "WindowResult", "k_val batch_size steps steps_run survivors extinction_step")):
+    """
+    Outcome of one Safe Window run.
+    
+    steps_run is below `steps` when the run stopped early (extinction, or the
+    survivor threshold was reached); extinction_step is the step at which the
+    last particle was expelled, or None while survivors remain.
+    """
+    __slots__ = ()
+    
+    @property
+    def survival_rate(self):
+        if not self.batch_size:
+            return 0.0
+        return 100 * self.survivors / self.batch_size
+
+def _fiber_dtype(compact):
+    """
+    Storage for n: int64, or uint32 in compact mode (p < 2^32, so fibers fit).
+    """
+    return np.uint32 if compact else np.int64
+
+def _base_dtype(n, k_val):
+    """
+    Storage for w: int64 next to int64 fibers, otherwise the narrowest unsigned
+    type holding every value w takes before dead particles are clamped (<= K+3).
+    """
+    if n.dtype == np.int64:
+        return np.int64
+    return np.min_scalar_type(k_val + 3)
+
+def _reference_step(n, w, alive_mask, k_val, inv2):
+    """
+    One step of the skew-product map, applied in place to (n, w, alive_mask).
+    """
+    # Filter dead particles to prevent overflow/waste
+    # (We clamp dead w to 2 just for safety)
+    w[~alive_mask] = 2
+    
+    is_odd = (w % 2 != 0)
+    is_even = ~is_odd
+    
+    # Even Update (w=4 -> 2, w=2 -> 1)
+    # (Gathered fibers are widened to int64, a no-op for int64 storage)
+    w[is_even] //= 2
+    n[is_even] = (n[is_even].astype(np.int64, copy=False) * inv2) % PRIME_MOD
+    
+    # Odd Update (w=1 -> 4?)
+    # If n is in Safe Window, carry=0 is guaranteed by initialization.
+    # If K=4, n returns to Safe Window. If K!=4, it permutes.
+    n_odd = n[is_odd].astype(np.int64, copy=False)
+    carry = (k_val * n_odd) // PRIME_MOD
+    
+    w[is_odd] = 3 * w[is_odd] + 1 + carry
+    n[is_odd] = (k_val * n_odd) % PRIME_MOD
+    
+    # Check Survival: Did anyone leave {1, 2, 4}?
+    current_in_loop = np.isin(w, [1, 2, 4])
+    alive_mask &= current_in_loop
+
+def _engine_reference(n, k_val, steps, stop_at=0):
+    """
+    Reference kernel: every particle stays in the arrays for all steps.
+    
+    Like every engine it returns (survivors, last expulsion step or -1, steps
+    run), stopping as soon as at most `stop_at` particles remain alive.
+    """
+    w = np.ones(n.size, dtype=_base_dtype(n, k_val)) # All start at w=1
+    inv2 = pow(2, PRIME_MOD - 2, PRIME_MOD)
+    
+    # Track survival
+    # A particle dies if it leaves the loop {1, 4, 2}
+    alive_mask = np.ones(n.size, dtype=bool)
+    alive, last_exit = n.size, -1
+    
+    for step in range(steps):
+        _reference_step(n, w, alive_mask, k_val, inv2)
+        
+        remaining = int(np.sum(alive_mask))
+        if remaining < alive:
+            last_exit = step
+        alive = remaining
+        if alive <= stop_at:
+            return alive, last_exit, step + 1
+
+    return alive, last_exit, steps
+
+def _engine_compact(n, k_val, steps, stop_at=0, threshold=COMPACT_THRESHOLD):
+    """
+    Active-set kernel: expelled particles are physically dropped from the arrays.
+    
+    The arrays are compacted down to the survivors whenever the alive fraction of
+    the tracked set falls below `threshold` (1.0 = compact every step). Expelled
+    particles never re-enter the loop, so the survivor count is exact and the
+    cost follows the live population instead of batch size x steps.
+    """
+    w = np.ones(n.size, dtype=_base_dtype(n, k_val))
+    inv2 = pow(2, PRIME_MOD - 2, PRIME_MOD)
+    alive_mask = np.ones(n.size, dtype=bool)
+    alive, last_exit = n.size, -1
+    
+    for step in range(steps):
+        _reference_step(n, w, alive_mask, k_val, inv2)
+        
+        remaining = int(np.count_nonzero(alive_mask))
+        if remaining < alive:
+            last_exit = step
+        alive = remaining
+        if alive <= stop_at:
+            return alive, last_exit, step + 1
+        
+        if alive < threshold * n.size:
+            n = n[alive_mask]
+            w = w[alive_mask]
+            alive_mask = np.ones(alive, dtype=bool)
+
+    return alive, last_exit, steps
+
+def _engine_fused(n, k_val, steps, stop_at=0):
+    """
+    Mask-free fused kernel: no boolean gathers/scatters, no per-step allocations.
+    
+    Both branches of the update are evaluated for every particle into
+    preallocated scratch buffers (`out=` targets) and blended arithmetically
+    with the parity bit. On the cycle an odd particle always has w=1, so:
+      - the carry gate c = floor(Kn/p) = 0 reduces to the threshold n <= limit,
+      - loop membership reduces to "no odd particle failed the gate",
+    and w itself only needs the branch-free update w -> (w >> 1) | (odd << 2).
+    Both fiber branches are division-free (see modular_arithmetic). Since w only
+    takes the values 1, 2, 4 it is stored as uint8 alongside uint32 fibers.
+    """
+    limit = gate_limit(k_val, PRIME_MOD)
+    times_k = ShoupMultiplier(k_val, PRIME_MOD)
+    size = n.size
+    base_dtype = np.int64 if n.dtype == np.int64 else np.uint8
+    
+    w = np.ones(size, dtype=base_dtype)
+    alive_mask = np.ones(size, dtype=bool)
+    
+    # Scratch buffers, reused every step
+    odd = np.empty(size, dtype=base_dtype)
+    n_odd = np.empty(size, dtype=np.int64)
+    n_even = np.empty(size, dtype=np.int64)
+    expelled = np.empty(size, dtype=bool)
+    scratch = np.empty(size, dtype=np.int64)
+    alive, last_exit = size, -1
+    
+    for step in range(steps):
+        np.bitwise_and(w, 1, out=odd)
+        
+        # Carry gate: odd particle outside the Safe Window leaves {1, 4, 2}
+        np.greater(n, limit, out=expelled)
+        np.logical_and(expelled, odd, out=expelled)
+        np.logical_not(expelled, out=expelled)
+        np.logical_and(alive_mask, expelled, out=alive_mask)
+        
+        remaining = int(np.count_nonzero(alive_mask))
+        if remaining < alive:
+            last_exit = step
+        alive = remaining
+        if alive <= stop_at:
+            return alive, last_exit, step + 1
+        
+        # Fiber update: n = n_even + odd * (n_odd - n_even)
+        times_k(n, out=n_odd, scratch=scratch)
+        halve_mod(n, PRIME_MOD, out=n_even, scratch=scratch)
+        np.subtract(n_odd, n_even, out=n_odd)
+        np.multiply(n_odd, odd, out=n_odd)
+        np.add(n_even, n_odd, out=n, casting="unsafe")
+        
+        # Base update: 1 -> 4, 4 -> 2, 2 -> 1
+        np.right_shift(w, 1, out=w)
+        np.left_shift(odd, 2, out=odd)
+        np.bitwise_or(w, odd, out=w)
+
+    return alive, last_exit, steps
+
+def _engine_return_map(n, k_val, steps, stop_at=0):
+    """
+    Return-map kernel: advances whole {1, 4, 2} cycles at once, no w array.
+    
+    On the cycle the carry gate is only met at w=1 (steps t = 0, 3, 6, ...),
+    and between gates the fiber evolves by R_K(n) = (K/4) n mod p (Lemma 2).
+    Survival after `steps` steps is survival of the ceil(steps/3) gates that
+    fall inside the horizon, i.e. identical to the per-step kernels.
+    
+    uint32 fibers are updated through WIDEN_BLOCK-sized int64 buffers, so
+    compact storage needs only 5 bytes per particle.
+    """
+    limit = gate_limit(k_val, PRIME_MOD)
+    ratio = k_val * pow(4, PRIME_MOD - 2, PRIME_MOD) % PRIME_MOD # K/4 mod p
+    times_ratio = ShoupMultiplier(ratio, PRIME_MOD)
+    gates = (steps + 2) // 3
+    wide = n.dtype == np.int64
+    
+    alive_mask = np.ones(n.size, dtype=bool)
+    in_window = np.empty(n.size, dtype=bool)
+    scratch = np.empty(n.size if wide else min(n.size, WIDEN_BLOCK), dtype=np.int64)
+    widened = None if wide else np.empty_like(scratch)
+    alive, last_exit = n.size, -1
+    
+    for gate in range(gates):
+        # Carry Gate (Lemma 1): c = 0 <=> n <= (p-1)/K
+        np.less_equal(n, limit, out=in_window)
+        np.logical_and(alive_mask, in_window, out=alive_mask)
+        
+        # The gate of return `gate` is step 3*gate of the per-step dynamics
+        remaining = int(np.count_nonzero(alive_mask))
+        if remaining < alive:
+            last_exit = 3 * gate
+        alive = remaining
+        if alive <= stop_at:
+            return alive, last_exit, 3 * gate + 1
+        
+        if gate + 1 < gates and wide:
+            times_ratio(n, out=n, scratch=scratch)
+        elif gate + 1 < gates:
+            for start in range(0, n.size, WIDEN_BLOCK):
+                block = n[start:start + WIDEN_BLOCK]
+                block_wide = widened[:block.size]
+                np.copyto(block_wide, block)
+                times_ratio(block_wide, out=block_wide, scratch=scratch[:block.size])
+                np.copyto(block, block_wide, casting="unsafe")
+
+    return alive, last_exit, steps
+
+def _return_powers(k_val, gates):
+    """
+    Table of (K/4)^k mod p for k = 0 .. gates-1.
+    """
+    ratio = k_val * pow(4, PRIME_MOD - 2, PRIME_MOD) % PRIME_MOD
+    powers = np.empty(gates, dtype=np.int64)
+    power = 1
+    for k in range(gates):
+        powers[k] = power
+        power = power * ratio % PRIME_MOD
+    return powers
+
+def _jump_exit_steps(n, k_val, steps, block_elements=JUMP_BLOCK_ELEMENTS):
+    """
+    Jump-ahead exit times: step at which each particle is expelled, -1 if it survives.
+    
+    After k returns the fiber is n0 * (K/4)^k mod p, so the gate at step 3k is a
+    pure function of n0. Each chunk of particles is tested against every gate at
+    once with a (chunk x gates) broadcast; the first failing gate comes from argmax.
+    Chunks are sized so a block holds at most `block_elements` cells.
+    """
+    limit = (PRIME_MOD - 1) // k_val
+    gates = (steps + 2) // 3
+    if gates == 0:
+        return np.full(n.size, -1, dtype=np.int64) # No gate inside the horizon
+    powers = _return_powers(k_val, gates)
+
+    chunk = max(1, block_elements // gates)
+    fibers = np.empty((chunk, gates), dtype=np.int64)
+    expelled = np.empty((chunk, gates), dtype=bool)
+    exit_steps = np.empty(n.size, dtype=np.int64)
+    
+    for start in range(0, n.size, chunk):
+        n_chunk = n[start:start + chunk]
+        rows = n_chunk.size
+        block = fibers[:rows]
+        failed = expelled[:rows]
+        
+        np.multiply(n_chunk[:, None], powers, out=block)
+        np.remainder(block, PRIME_MOD, out=block)
+        np.greater(block, limit, out=failed)
+        
+        first_gate = np.argmax(failed, axis=1)
+        exits = exit_steps[start:start + rows]
+        np.multiply(first_gate, 3, out=exits)
+        exits[~failed[np.arange(rows), first_gate]] = -1
+
+    return exit_steps
+
+def _engine_jump(n, k_val, steps, stop_at=0, block_elements=JUMP_BLOCK_ELEMENTS):
+    """
+    Jump-ahead kernel: no step loop, one vectorized pass per chunk (see _jump_exit_steps).
+    
+    Every exit time is known up front, so the early stop is read off the
+    alive-count curve instead of saving work.
+    """
+    exit_steps = _jump_exit_steps(n, k_val, steps, block_elements)
+    return _summarize_exits(exit_steps, steps, stop_at)
+
+def _engine_numba(n, k_val, steps, stop_at=0):
+    """
+    Compiled single-pass kernel (see numba_backend); falls back to the fused
+    NumPy kernel when numba is not installed.
+    """
+    if not numba_backend.NUMBA_AVAILABLE:
+        return _engine_fused(n, k_val, steps, stop_at)
+    exit_steps = numba_backend.exit_steps(n, k_val, PRIME_MOD, steps)
+    return _summarize_exits(exit_steps, steps, stop_at)
+
+def _engine_scalar(n, k_val, steps, stop_at=0):
+    """
+    Pure-Python kernel: one particle at a time on Python ints, no array setup.
+    Only worthwhile for tiny batches, where NumPy's per-call overhead dominates.
+    """
+    limit = (PRIME_MOD - 1) // k_val
+    ratio = k_val * pow(4, PRIME_MOD - 2, PRIME_MOD) % PRIME_MOD
+    exit_steps = np.full(n.size, -1, dtype=np.int64)
+    
+    for i, fiber in enumerate(n.tolist()):
+        for gate in range(0, steps, 3):
+            if fiber > limit:
+                exit_steps[i] = gate
+                break
+            fiber = fiber * ratio % PRIME_MOD
+    
+    return _summarize_exits(exit_steps, steps, stop_at)
+
+def _summarize_exits(exit_steps, steps, stop_at):
+    """
+    Engine result (survivors, last exit step, steps run) from per-particle exit
+    steps, applying the `stop_at` early stop to the alive-count curve.
+    """
+    deaths = np.bincount(exit_steps[exit_steps >= 0], minlength=steps)
+    alive_after = exit_steps.size - np.cumsum(deaths)
+    
+    stops = np.flatnonzero(alive_after <= stop_at)
+    steps_run = int(stops[0]) + 1 if stops.size else steps
+    exits = np.flatnonzero(deaths[:steps_run])
+    last_exit = int(exits[-1]) if exits.size else -1
+    alive = int(alive_after[steps_run - 1]) if steps_run else exit_steps.size
+    return alive, last_exit, steps_run
+
+@functools.lru_cache(maxsize=None)
+def _detect_cache_bytes():
+    """
+    Per-core L2 size from sysfs (Linux), else DEFAULT_CACHE_BYTES.
+    """
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    for index in sorted(glob.glob("/sys/devices/system/cpu/cpu0/cache/index*")):
+        try:
+            with open(os.path.join(index, "level")) as f:
+                level = f.read().strip()
+            with open(os.path.join(index, "size")) as f:
+                size = f.read().strip()
+        except OSError:
+            continue
+        if level == "2" and size:
+            return int(size.rstrip("KMG")) * units.get(size[-1], 1)
+    return DEFAULT_CACHE_BYTES
+
+def auto_tile_size():
+    """
+    Particles per tile such that a tile's working set fits in L2.
+    """
+    return max(1, _detect_cache_bytes() // TILE_BYTES_PER_PARTICLE)
+
+# ==============================================================================
+# ENGINE REGISTRY
+# An engine is a callable (n, k_val, steps, stop_at) -> (survivors, last exit
+# step or -1, steps run). It receives initial fibers n (int64 or uint32, all at
+# w=1), may modify them in place, and must agree exactly with the reference.
+# engine="auto" picks the fastest engine and tile size for the host from a
+# short calibration run, cached per (batch size, horizon) bucket on disk.
+# ==============================================================================
+
+ENGINES = {
+    "reference": _engine_reference,
+    "compact": _engine_compact,
+    "fused": _engine_fused,
+    "return_map": _engine_return_map,
+    "jump": _engine_jump,
+    "numba": _engine_numba,
+    "scalar": _engine_scalar,
+}
+SELF_PARALLEL_ENGINES = {"numba"}  # Spread one call over all cores themselves; never called from several threads
+
+_calibration_cache = None
+
+def register_engine(name, kernel):
+    """
+    Add (or replace) an engine; it becomes a candidate for engine="auto".
+    """
+    ENGINES[name] = kernel
+
+def _calibration_path():
+    default = os.path.join(os.path.expanduser("~"), ".cache", "k4_resonance", "engine_calibration.json")
+    return os.environ.get(CALIBRATION_CACHE_ENV, default)
+
+def _calibration_bucket(batch_size, steps):
+    """
+    Power-of-two buckets of batch size and horizon, e.g. "17:6".
+    """
+    return f"{max(batch_size, 1).bit_length()}:{max(steps, 1).bit_length()}"
+
+def _load_calibration():
+    """
+    {bucket: {"engine": name, "tile_size": int}} for this host, read once per process.
+    """
+    global _calibration_cache
+    if _calibration_cache is None:
+        try:
+            with open(_calibration_path()) as f:
+                _calibration_cache = json.load(f)
+        except (OSError, ValueError):
+            _calibration_cache = {}
+    return _calibration_cache.setdefault(platform.node(), {})
+
+def _save_calibration():
+    """
+    Persist the calibration cache; a read-only location only loses the cache.
+    """
+    path = _calibration_path()
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(_calibration_cache, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def _engine_candidates(batch_size):
+    """
+    Engines worth timing for a batch: the scalar engine only for tiny batches,
+    the compiled one only when it is really compiled.
+    """
+    for name, kernel in ENGINES.items():
+        if name == "scalar" and batch_size > SCALAR_MAX_BATCH:
+            continue
+        if name == "numba" and not numba_backend.NUMBA_AVAILABLE:
+            continue
+        yield name, kernel
+
+def calibrate_engines(batch_size, steps):
+    """
+    Time every candidate (engine, tile size) on a sample of the workload.
+    
+    The sample holds about CALIBRATION_WORK particle-steps and uses K=4, the
+    case that never goes extinct. Untiled runs are only candidates when the
+    sample is the whole batch, since a small sample hides the cache misses of
+    a large untiled batch. Returns {"engine": name, "tile_size": int, "timings": ...}.
+    """
+    sample = min(max(batch_size, 1), max(SCALAR_MAX_BATCH, CALIBRATION_WORK // max(steps, 1)))
+    n0 = np.random.default_rng(0).integers(1, gate_limit(4, PRIME_MOD) + 1, sample, dtype=np.int64)
+    
+    base_tile = auto_tile_size()
+    tiles = sorted({tile for tile in (base_tile // 4, base_tile) if 0 < tile < sample})
+    if sample >= batch_size:
+        tiles.append(0)
+    
+    timings = {}
+    for name, kernel in _engine_candidates(batch_size):
+        kernel(n0[:SCALAR_MAX_BATCH].copy(), 4, steps) # Warm-up (e.g. JIT compilation)
+        for tile in ([0] if name == "scalar" else tiles):
+            n = n0.copy()
+            start = time.perf_counter()
+            for lo in range(0, sample, tile or sample):
+                kernel(n[lo:lo + (tile or sample)], 4, steps)
+            timings[f"{name}/{tile}"] = time.perf_counter() - start
+    
+    best = min(timings, key=timings.get)
+    name, tile = best.split("/")
+    return {"engine": name, "tile_size": int(tile), "timings": timings}
+
+def select_engine(batch_size, steps):
+    """
+    (engine name, tile size) for this workload: cached, or calibrated on first use.
+    """
+    if batch_size <= 0 or steps <= 0:
+        return "reference", 0 # Nothing to simulate, so nothing to time
+    bucket = _calibration_bucket(batch_size, steps)
+    host_cache = _load_calibration()
+    choice = host_cache.get(bucket)
+    if choice is None or choice.get("engine") not in ENGINES:
+        choice = calibrate_engines(batch_size, steps)
+        host_cache[bucket] = choice
+        _save_calibration()
+    return choice["engine"], choice["tile_size"]
+
+def _merge_outcomes(outcomes):
+    """
+    Exact reduction of engine results over disjoint parts of one population.
+    
+    Parts only stop early on extinction, which cannot change the totals.
+    """
+    survivors, last_exit, steps_run = 0, -1, 0
+    for part_survivors, part_exit, part_steps in outcomes:
+        survivors += part_survivors
+        last_exit = max(last_exit, part_exit)
+        steps_run = max(steps_run, part_steps)
+    return survivors, last_exit, steps_run
+
+def _run_tiles(kernel, n, k_val, steps, stop_at, tile_size):
+    """
+    Run `kernel` over consecutive tiles of `n`, each through all steps.
+    """
+    tile_size = max(tile_size, 1)
+    return _merge_outcomes(kernel(n[start:start + tile_size], k_val, steps, stop_at)
+                           for start in range(0, n.size, tile_size))
+
+def _chunk_generator(seed, k_val, chunk_index):
+    """
+    Philox stream of one random chunk: the SeedSequence(seed) child at spawn key (K, chunk).
+    """
+    sequence = np.random.SeedSequence(seed, spawn_key=(k_val, chunk_index))
+    return np.random.Generator(np.random.Philox(sequence))
+
+def draw_window_fibers(k_val, seed, count, offset=0, compact_dtypes=False, out=None):
+    """
+    Particles [offset, offset + count) of the seeded Safe Window draw for K.
+    
+    Particle i is taken from random chunk i // RANDOM_CHUNK_SIZE, whose stream
+    depends only on (seed, K, chunk index), so the particles do not depend on
+    how a run is split over workers, threads or tasks. Draws are uint32
+    (limit < p < 2^32), written straight into compact storage or widened into
+    int64, so compact and full-width runs see the same particles.
+    """
+    limit = (PRIME_MOD - 1) // k_val
+    if out is None:
+        out = np.empty(count, dtype=_fiber_dtype(compact_dtypes))
+    position, end = offset, offset + count
+    while position < end:
+        chunk_index, first = divmod(position, RANDOM_CHUNK_SIZE)
+        stop = min(RANDOM_CHUNK_SIZE, first + end - position)
+        # A bounded stream is drawn in order, so a chunk prefix equals the start of the full chunk
+        values = _chunk_generator(seed, k_val, chunk_index).integers(1, limit + 1, stop, dtype=np.uint32)
+        out[position - offset:position - offset + stop - first] = values[first:]
+        position += stop - first
+    return out
+
+def simulate_window_invariance(k_val, engine="auto", compact_threshold=COMPACT_THRESHOLD,
+                               batch_size=BATCH_SIZE, steps=TEST_STEPS, compact_dtypes=False,
+                               tile_size=None, stop_at=0, threads=1, seed=None, offset=0):
     """
     Test: Does the 'Safe Window' [0, (p-1)/K] remain invariant under dynamics?
     
     1. Initialize w = 1 (Start of the cycle)
     2. Initialize n strictly inside the Safe Window.
     3. Run dynamics checking strictly for Loop Residence.
+    
+    Returns a WindowResult. The run stops as soon as the population is extinct,
+    or once at most `stop_at` particles survive.
+    
+    engine: "auto" dispatches to the calibrated best engine (see select_engine),
+            "reference" keeps the full batch for all steps,
+            "compact" drops expelled particles (see _engine_compact),
+            "fused" runs the allocation-free step kernel (see _engine_fused),
+            "return_map" advances one full cycle per pass (see _engine_return_map),
+            "jump" evaluates all gates at once from power tables (see _engine_jump),
+            "numba" runs the compiled per-particle kernel (see _engine_numba),
+            "scalar" loops over particles in pure Python (see _engine_scalar),
+            or any name added with register_engine.
+    compact_dtypes: store n as uint32 and w as uint8 (int16 for very large K),
+            widening to int64 only for the products K*n.
+    tile_size: particles run through all steps before moving on to the next
+            tile (temporal tiling keeps each tile cache-resident). None picks
+            auto_tile_size() (or the calibrated size for engine="auto") and
+            tiles whenever the batch is larger; 0 disables.
+            A survivor threshold (stop_at > 0) applies to the whole batch, so
+            such runs are never tiled.
+    threads: split the batch into independent chunks processed on a thread
+            pool (0 = all cores). NumPy ufuncs release the GIL; every chunk
+            allocates its own scratch buffers and the per-chunk counts are
+            summed exactly. Ignored when stop_at > 0 and for engines in
+            SELF_PARALLEL_ENGINES, whose kernel already uses every core and
+            is not safe to enter from several threads at once.
+    seed: None draws from the global np.random state; an int makes the run
+            reproducible via draw_window_fibers, independent of `threads`.
+    offset: index of the first particle in the seeded draw, so disjoint
+            tasks of one large seeded run take [offset, offset + batch_size).
     """
     
     # 1. Define the Safe Window Limit (Strict Inequality Corrected)
     # We need c = floor(Kn/p) = 0  => Kn < p => n <= (p-1)/K
+    if k_val < 1:
+        raise ValueError(f"K must be at least 1, got {k_val}")
     limit = (PRIME_MOD - 1) // k_val
     
     if limit < 1: 
-        return 0.0 # Window is closed (K >= p)
+        return WindowResult(k_val, batch_size, steps, 0, 0, None) # Window is closed (K >= p)
 
+    if threads == 0:
+        threads = os.cpu_count() or 1
+    
     # 2. Initialize strictly satisfying Lemma 1 (Theorem Condition)
     # We pick random n inside [1, limit]
-    n = np.random.randint(1, limit + 1, BATCH_SIZE).astype(np.int64)
-    w = np.ones(BATCH_SIZE, dtype=np.int64) # All start at w=1
-    inv2 = pow(2, PRIME_MOD - 2, PRIME_MOD)
+    if seed is None:
+        n = np.random.randint(1, limit + 1, batch_size, dtype=_fiber_dtype(compact_dtypes))
+    else:
+        n = np.empty(batch_size, dtype=_fiber_dtype(compact_dtypes))
+        spans = range(0, batch_size, RANDOM_CHUNK_SIZE)
+        fill = lambda start: draw_window_fibers(k_val, seed, min(RANDOM_CHUNK_SIZE, batch_size - start),
+                                                offset + start, out=n[start:start + RANDOM_CHUNK_SIZE])
+        if threads > 1 and len(spans) > 1:
+            # Every chunk owns its generator, so the draws run in parallel without the GIL
+            with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(fill, spans))
+        else:
+            for start in spans:
+                fill(start)
     
-    # Track survival
-    # A particle dies if it leaves the loop {1, 4, 2}
-    alive_mask = np.ones(BATCH_SIZE, dtype=bool)
+    # 3. Run the dynamics, one cache-sized tile at a time
+    if engine == "auto":
+        engine, calibrated_tile = select_engine(batch_size, steps)
+        if tile_size is None:
+            tile_size = calibrated_tile
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine!r}")
+    kernel = ENGINES[engine]
+    if engine == "compact":
+        kernel = functools.partial(kernel, threshold=compact_threshold)
     
-    for _ in range(TEST_STEPS):
-        # Filter dead particles to prevent overflow/waste
-        # (We clamp dead w to 2 just for safety)
-        w[~alive_mask] = 2
-        
-        is_odd = (w % 2 != 0)
-        is_even = ~is_odd
-        
-        # Even Update (w=4 -> 2, w=2 -> 1)
-        w[is_even] //= 2
-        n[is_even] = (n[is_even] * inv2) % PRIME_MOD
-        
-        # Odd Update (w=1 -> 4?)
-        # If n is in Safe Window, carry=0 is guaranteed by initialization.
-        # If K=4, n returns to Safe Window. If K!=4, it permutes.
-        n_odd = n[is_odd]
-        carry = (k_val * n_odd) // PRIME_MOD
-        
-        w[is_odd] = 3 * w[is_odd] + 1 + carry
-        n[is_odd] = (k_val * n_odd) % PRIME_MOD
-        
-        # Check Survival: Did anyone leave {1, 2, 4}?
-        current_in_loop = np.isin(w, [1, 2, 4])
-        alive_mask &= current_in_loop
+    if tile_size is None:
+        tile_size = auto_tile_size()
+    if not tile_size or tile_size >= batch_size or stop_at > 0:
+        tile_size = batch_size
+    
+    if threads > 1 and stop_at == 0 and batch_size > 1 and engine not in SELF_PARALLEL_ENGINES:
+        # Chunks of a tiled run are whole numbers of tiles, so threading never changes the tiling
+        chunks = threads * THREAD_CHUNKS_PER_WORKER
+        chunk_size = -(-batch_size // chunks)
+        if tile_size < batch_size:
+            chunk_size = -(-chunk_size // tile_size) * tile_size
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+            outcomes = pool.map(lambda start: _run_tiles(kernel, n[start:start + chunk_size], k_val,
+                                                          steps, stop_at, tile_size),
+                                range(0, batch_size, chunk_size))
+            survivors, last_exit, steps_run = _merge_outcomes(outcomes)
+    else:
+        survivors, last_exit, steps_run = _run_tiles(kernel, n, k_val, steps, stop_at, tile_size)
+
+    extinction_step = last_exit if survivors == 0 and last_exit >= 0 else None
+    return WindowResult(k_val, batch_size, steps, steps_run, survivors, extinction_step)
+
+def merge_window_results(results):
+    """
+    Exact combination of WindowResults for disjoint batches with the same K and horizon.
+    """
+    results = list(results)
+    survivors = sum(result.survivors for result in results)
+    steps_run = max((result.steps_run for result in results), default=0)
+    extinction_steps = [result.extinction_step for result in results if result.extinction_step is not None]
+    extinction_step = max(extinction_steps) if survivors == 0 and extinction_steps else None
+    first = results[0]
+    return WindowResult(first.k_val, sum(result.batch_size for result in results), first.steps,
+                        steps_run, survivors, extinction_step)
+
+def verify_window_invariance(k_val, **options):
+    """
+    Survival rate (%) of the Safe Window test; see simulate_window_invariance.
+    """
+    return simulate_window_invariance(k_val, **options).survival_rate
+
+def _multi_k_deaths(n, counts, limits, ratios, steps):
+    """
+    Particles expelled per (K row, gate); n holds the rows' fibers back to back.
+    
+    Row i has counts[i] cells, gate limit limits[i] and return ratio ratios[i].
+    Return-map dynamics as in _engine_return_map. Expelled cells are compacted
+    away (which keeps the rows contiguous), extinct rows drop out of the loop,
+    and per-cell limits and ratios are rebuilt with np.repeat from the
+    surviving row counts. Fibers and ratios are below p < 2^30, so products
+    fit int64 and a plain remainder replaces the Shoup step.
+    """
+    gates = (steps + 2) // 3
+    deaths = np.zeros((len(counts), gates), dtype=np.int64)
+    live = np.arange(len(counts))
+    counts = np.asarray(counts, dtype=np.int64)
+    
+    for gate in range(gates):
+        # Carry Gate (Lemma 1); gate 0 passes by construction (fibers start inside the window)
+        if gate:
+            in_window = n <= np.repeat(limits[live], counts)
+            kept = np.add.reduceat(in_window, np.cumsum(counts) - counts, dtype=np.int64)
+            deaths[live, gate] = counts - kept
+            if (kept < counts).any():
+                n = n[in_window]
+                live, counts = live[kept > 0], kept[kept > 0]
+            if not n.size:
+                break
+        if gate + 1 < gates:
+            np.multiply(n, np.repeat(ratios[live], counts), out=n)
+            np.remainder(n, PRIME_MOD, out=n)
+    return deaths
 
-    survival_rate = 100 * np.sum(alive_mask) / BATCH_SIZE
-    return survival_rate
+def _deaths_outcome(deaths, size, steps):
+    """
+    Engine result (survivors, last exit step, steps run) of one row of gate deaths.
+    """
+    alive_after = size - np.cumsum(deaths)
+    extinct = np.flatnonzero(alive_after == 0)
+    dead_gates = np.flatnonzero(deaths)
+    last_exit = 3 * int(dead_gates[-1]) if dead_gates.size else -1
+    if extinct.size:
+        return 0, last_exit, 3 * int(extinct[0]) + 1
+    return int(alive_after[-1]) if alive_after.size else size, last_exit, steps
 
-def run_theorem_check():
+def simulate_multi_k(k_values, batch_size=BATCH_SIZE, steps=TEST_STEPS, seed=None,
+                     block_elements=MULTI_K_BLOCK_ELEMENTS):
+    """
+    Safe Window test for every K in one vectorized (num_K x N) pass.
+    
+    Common random numbers: one base draw r in [0, 2^32) per particle is
+    rescaled into each window as n = 1 + floor(r * limit_K / 2^32), so all K
+    see the same population quantiles and differences between K have lower
+    variance than with independent draws. The Python loop runs once per gate
+    for all K together; particles are processed in blocks of at most
+    `block_elements` cells. seed=None draws from the global np.random state.
+    
+    Returns WindowResults in k_values order.
+    """
+    k_values = list(k_values)
+    if seed is None:
+        base = np.random.randint(0, 1 << 32, batch_size, dtype=np.uint32)
+    else:
+        generator = np.random.Generator(np.random.Philox(np.random.SeedSequence(seed)))
+        base = generator.integers(0, 1 << 32, batch_size, dtype=np.uint32)
+    
+    open_k = [k for k in k_values if (PRIME_MOD - 1) // k >= 1] # K >= p closes the window
+    limits = np.array([(PRIME_MOD - 1) // k for k in open_k], dtype=np.int64)
+    inv4 = pow(4, PRIME_MOD - 2, PRIME_MOD)
+    ratios = np.array([k * inv4 % PRIME_MOD for k in open_k], dtype=np.int64)
+    
+    outcomes = {k: [] for k in open_k}
+    block = max(1, block_elements // max(len(open_k), 1))
+    for start in range(0, batch_size if open_k else 0, block):
+        part = base[start:start + block]
+        n = part[None, :] * limits[:, None] # < 2^32 * 2^30, fits int64
+        np.right_shift(n, 32, out=n)
+        n += 1
+        counts = np.full(len(open_k), part.size, dtype=np.int64)
+        deaths = _multi_k_deaths(n.ravel(), counts, limits, ratios, steps)
+        for k, row_deaths in zip(open_k, deaths):
+            outcomes[k].append(_deaths_outcome(row_deaths, part.size, steps))
+    
+    results = []
+    for k in k_values:
+        if k not in outcomes:
+            results.append(WindowResult(k, batch_size, steps, 0, 0, None))
+            continue
+        survivors, last_exit, steps_run = _merge_outcomes(outcomes[k])
+        extinction_step = last_exit if survivors == 0 and last_exit >= 0 else None
+        results.append(WindowResult(k, batch_size, steps, steps_run, survivors, extinction_step))
+    return results
+
+DEFAULT_K_VALUES = [2, 3, 4, 5, 6, 8, 16]
+
+def _sweep_task(k_val, engine, tile_size, seed):
+    """
+    One K of the sweep (module level so process pools can pickle it).
+    """
+    return simulate_window_invariance(k_val, engine=engine, tile_size=tile_size, seed=seed)
+
+def _format_sweep_row(k, result):
+    limit = (PRIME_MOD - 1) // k
+    rate = result.survival_rate
+    
+    status = f"{rate:6.2f}%"
+    if rate > 99.9:
+        status += "  [STRICT INVARIANCE CONFIRMED]"
+    elif result.extinction_step is not None:
+        status += f"  [EXTINCTION OBSERVED @ step {result.extinction_step}]"
+    else:
+        status += "  [EXTINCTION OBSERVED]"
+        
+    return f"K={k:<8} | {limit:<25} | {status}"
+
+def run_theorem_check(engine="auto", k_values=None, workers=1, seed=None, batched=False):
+    """
+    Print the Safe Window survival table for each K (DEFAULT_K_VALUES if None).
+    
+    With workers > 1 (0 = all cores) the K values are spread over a process
+    pool; rows are still printed in K order, each as soon as it and every row
+    before it is done. A seed makes every row reproducible, whatever the
+    number of workers. batched=True runs all K in one pass of the multi-K
+    kernel with common random numbers (see simulate_multi_k) instead.
+    Returns the WindowResults in K order.
+    """
+    if k_values is None:
+        k_values = DEFAULT_K_VALUES
+    k_values = list(k_values)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    
     print(f"--- THEOREM VERIFICATION (N={BATCH_SIZE}) ---")
     print("Test Condition: Initialized strictly inside Safe Window (w=1, n <= (p-1)/K)")
     print("Hypothesis: K=4 is Invariant. K!=4 is Sifted.")
@@ -73,21 +824,74 @@ def run_theorem_check():
     print(f"{'K-Factor':<10} | {'Safe Limit (n <= ...)':<25} | {'Stability'}")
     print("-" * 65)
     
-    k_values = [2, 3, 4, 5, 6, 8, 16]
+    if batched:
+        results = simulate_multi_k(k_values, seed=seed)
+        for k, result in zip(k_values, results):
+            print(_format_sweep_row(k, result))
+        print("-" * 65)
+        return results
     
-    for k in k_values:
-        limit = (PRIME_MOD - 1) // k
-        rate = verify_window_invariance(k)
-        
-        status = f"{rate:6.2f}%"
-        if rate > 99.9:
-            status += "  [STRICT INVARIANCE CONFIRMED]"
-        else:
-            status += "  [EXTINCTION OBSERVED]"
-            
-        print(f"K={k:<8} | {limit:<25} | {status}")
+    # Calibrate once here rather than in every worker
+    tile_size = None
+    if engine == "auto":
+        engine, tile_size = select_engine(BATCH_SIZE, TEST_STEPS)
+    task = functools.partial(_sweep_task, engine=engine, tile_size=tile_size, seed=seed)
+    
+    results = []
+    if workers > 1:
+        chunksize = max(1, len(k_values) // (8 * workers))
+        # Spawned, not forked: calibration may have started compiled-kernel threads here
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                                    initializer=numba_backend.pin_single_thread) as pool:
+            # map() yields in submission order, i.e. in K order as results arrive
+            for k, result in zip(k_values, pool.map(task, k_values, chunksize=chunksize)):
+                print(_format_sweep_row(k, result), flush=True)
+                results.append(result)
+    else:
+        for k in k_values:
+            result = task(k)
+            print(_format_sweep_row(k, result), flush=True)
+            results.append(result)
         
     print("-" * 65)
+    return results
+
+def _add_k_arguments(parser, k_help="K values to test"):
+    """
+    The --k / --k-range options shared by every sweep CLI (read back with _parse_k_values).
+    """
+    parser.add_argument("--k", type=int, nargs="+", help=k_help)
+    parser.add_argument("--k-range", type=int, nargs="+", action="append", metavar="START STOP [STEP]",
+                        help="add range(START, STOP[, STEP]) to the K values (repeatable)")
+
+def _parse_k_values(parser, args, default=None):
+    """
+    K values from --k and --k-range, or `default` if none; malformed ranges and K < 1 are usage errors.
+    """
+    for k_range in args.k_range or []:
+        if not 2 <= len(k_range) <= 3:
+            parser.error("--k-range takes START STOP [STEP]")
+    k_values = list(args.k or [])
+    for k_range in args.k_range or []:
+        k_values.extend(range(*k_range))
+    invalid = [k for k in k_values if k < 1]
+    if invalid:
+        parser.error(f"K must be at least 1, got {invalid[0]}")
+    return k_values or default
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify Safe Window invariance for a sweep of K values.")
+    _add_k_arguments(parser)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (0 = all cores)")
+    parser.add_argument("--engine", default="auto", help="simulation engine (default: auto)")
+    parser.add_argument("--seed", type=int, help="seed for a reproducible draw")
+    parser.add_argument("--batched", action="store_true",
+                        help="all K in one multi-K pass with common random numbers")
+    args = parser.parse_args(argv)
+    
+    run_theorem_check(engine=args.engine, k_values=_parse_k_values(parser, args), workers=args.workers, seed=args.seed,
+                      batched=args.batched)
 
 if __name__ == "__main__":
-    run_theorem_check()
+    main()
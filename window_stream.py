@@ -0,0 +1,239 @@
+import argparse
+import collections
+import concurrent.futures
+import queue
+import numpy as np
+
+import numba_backend
+from theorem_verifier import (JUMP_BLOCK_ELEMENTS, PRIME_MOD, TEST_STEPS, _fiber_dtype, _jump_exit_steps,
+                              draw_window_fibers)
+
+# ==============================================================================
+# OUT-OF-CORE STREAMING VERIFIER
+# Runs sample sizes far beyond RAM (e.g. 10^11 particles) under a fixed memory
+# budget: fixed-size chunks are generated, simulated and reduced through a
+# generator pipeline, so peak memory depends on the budget, not the total.
+# The reduction keeps exact survivor counts and the histogram of exit steps.
+# By default the three stages overlap on separate threads: a sampler fills
+# recycled fiber buffers, the simulator runs the kernel on the previous one
+# and a reducer folds its exit steps, so RNG, compute and reduction proceed
+# concurrently. The GIL is released by the RNG, NumPy and numba kernels.
+# ==============================================================================
+
+STREAM_MEMORY_BUDGET = 256 << 20  # Default bytes for one chunk in flight
+STREAM_BYTES_PER_PARTICLE = 24  # Fiber + exit step + bincount/selection temporaries
+PIPELINE_DEPTH = 2  # Recycled fiber buffers between sampler and simulator (double buffering)
+STREAM_MIN_CHUNK = 1 << 16  # Smallest chunk a budget must hold; per-chunk overhead dominates below this
+JUMP_BUDGET_SHARE = 4  # Without numba the jump-ahead block takes at most 1/4 of the budget
+
+class StreamResult(collections.namedtuple("StreamResult", "k_val total steps survivors exit_histogram")):
+    """
+    Outcome of a streamed run: exit_histogram[t] particles were expelled at step t.
+    """
+    __slots__ = ()
+
+    @property
+    def survival_rate(self):
+        if not self.total:
+            return 0.0
+        return 100 * self.survivors / self.total
+
+    @property
+    def extinction_step(self):
+        """
+        Step at which the last particle was expelled, None while survivors remain.
+        """
+        exits = np.flatnonzero(self.exit_histogram)
+        if self.survivors or not exits.size:
+            return None
+        return int(exits[-1])
+
+def jump_block_for_budget(memory_budget):
+    """
+    Cells of the jump-ahead block under `memory_budget`: 0 when the compiled kernel runs instead.
+    """
+    if numba_backend.NUMBA_AVAILABLE:
+        return 0
+    return min(JUMP_BLOCK_ELEMENTS, memory_budget // (JUMP_BUDGET_SHARE * 9)) # int64 fibers + bool gate per cell
+
+def chunk_size_for_budget(memory_budget, chunks_in_flight=1):
+    """
+    Particles per chunk so that `chunks_in_flight` chunks plus the jump-ahead block fit the budget.
+
+    Raises ValueError if that leaves fewer than STREAM_MIN_CHUNK particles per chunk.
+    """
+    block_bytes = jump_block_for_budget(memory_budget) * 9
+    chunk_size = (memory_budget - block_bytes) // (STREAM_BYTES_PER_PARTICLE * chunks_in_flight)
+    if chunk_size < STREAM_MIN_CHUNK:
+        raise ValueError(f"Memory budget of {memory_budget} bytes leaves {max(chunk_size, 0)} particles for each of "
+                         f"{chunks_in_flight} chunk(s) in flight; at least {STREAM_MIN_CHUNK} are needed")
+    return chunk_size
+
+def _chunk_exit_steps(n, k_val, steps, block_elements=JUMP_BLOCK_ELEMENTS):
+    """
+    Exit step per particle (-1 = survivor): compiled kernel if available, else jump-ahead.
+    """
+    if numba_backend.NUMBA_AVAILABLE:
+        return numba_backend.exit_steps(n, k_val, PRIME_MOD, steps)
+    return _jump_exit_steps(n, k_val, steps, block_elements)
+
+def sample_chunks(k_val, total, chunk_size, compact_dtypes=False, seed=None):
+    """
+    Stage 1: initial fibers drawn uniformly from the Safe Window, chunk by chunk.
+
+    With a seed the particles are those of the seeded draw, whatever the chunk size.
+    """
+    limit = (PRIME_MOD - 1) // k_val
+    for start in range(0, total, chunk_size):
+        count = min(chunk_size, total - start)
+        if seed is None:
+            yield np.random.randint(1, limit + 1, count, dtype=_fiber_dtype(compact_dtypes))
+        else:
+            yield draw_window_fibers(k_val, seed, count, start, compact_dtypes)
+
+def simulate_chunks(chunks, k_val, steps, block_elements=JUMP_BLOCK_ELEMENTS):
+    """
+    Stage 2: exit steps for every chunk of fibers.
+    """
+    for n in chunks:
+        yield _chunk_exit_steps(n, k_val, steps, block_elements)
+
+def reduce_chunks(exit_chunks, k_val, total, steps):
+    """
+    Stage 3: fold exit steps into exact survivor counts and the exit histogram.
+    """
+    survivors = 0
+    histogram = np.zeros(steps, dtype=np.int64)
+    for exit_steps in exit_chunks:
+        expelled = exit_steps[exit_steps >= 0]
+        survivors += exit_steps.size - expelled.size
+        histogram += np.bincount(expelled, minlength=steps)
+    return StreamResult(k_val, total, steps, survivors, histogram)
+
+def _drain(stage_queue):
+    """
+    Items of `stage_queue` up to the None end marker.
+    """
+    while True:
+        item = stage_queue.get()
+        if item is None:
+            return
+        yield item
+
+def _sample_stage(k_val, total, chunk_size, seed, free_buffers, filled):
+    """
+    Pipeline stage 1: draw each chunk into the next recycled buffer (None in free_buffers stops it).
+    """
+    try:
+        for start in range(0, total, chunk_size):
+            buffer = free_buffers.get()
+            if buffer is None:
+                return
+            count = min(chunk_size, total - start)
+            draw_window_fibers(k_val, seed, count, start, out=buffer[:count])
+            filled.put((buffer, count))
+    finally:
+        filled.put(None)
+
+def _reduce_stage(exits, k_val, total, steps):
+    """
+    Pipeline stage 3: reduce_chunks over the queue, which is still drained after a failure.
+    """
+    try:
+        return reduce_chunks(_drain(exits), k_val, total, steps)
+    except BaseException:
+        for _ in _drain(exits): # Keep the simulator from blocking on a full queue
+            pass
+        raise
+
+def _pipelined_exits(k_val, total, chunk_size, steps, compact_dtypes, seed, depth, exits, block_elements):
+    """
+    Run the sampler thread and simulate every chunk it fills, handing exit steps to `exits`.
+    """
+    free_buffers, filled = queue.Queue(), queue.Queue()
+    for _ in range(depth):
+        free_buffers.put(np.empty(min(chunk_size, total), dtype=_fiber_dtype(compact_dtypes)))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        sampler = pool.submit(_sample_stage, k_val, total, chunk_size, seed, free_buffers, filled)
+        try:
+            for buffer, count in _drain(filled):
+                exit_steps = _chunk_exit_steps(buffer[:count], k_val, steps, block_elements)
+                free_buffers.put(buffer)
+                exits.put(exit_steps)
+        finally:
+            free_buffers.put(None) # Unblocks the sampler if the simulator stopped early
+        sampler.result()
+
+def pipelined_window_invariance(k_val, total, memory_budget=STREAM_MEMORY_BUDGET, steps=TEST_STEPS,
+                                compact_dtypes=False, seed=None, depth=PIPELINE_DEPTH):
+    """
+    Streamed Safe Window test with sampling, simulation and reduction overlapped.
+
+    `depth` fiber buffers circulate between sampler and simulator, and at most
+    `depth` exit-step chunks wait for the reducer, so memory stays bounded by
+    `memory_budget`. Unseeded runs draw a fresh seed (see draw_window_fibers).
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    chunk_size = chunk_size_for_budget(memory_budget, 2 * depth + 1)
+    exits = queue.Queue(depth)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        reducer = pool.submit(_reduce_stage, exits, k_val, total, steps)
+        try:
+            _pipelined_exits(k_val, total, chunk_size, steps, compact_dtypes, seed, depth, exits,
+                             jump_block_for_budget(memory_budget))
+        finally:
+            exits.put(None)
+        return reducer.result()
+
+def stream_window_invariance(k_val, total, memory_budget=STREAM_MEMORY_BUDGET, steps=TEST_STEPS,
+                             compact_dtypes=False, seed=None, pipeline_depth=PIPELINE_DEPTH):
+    """
+    Safe Window test over `total` particles with peak memory bounded by `memory_budget`.
+
+    pipeline_depth > 0 overlaps the stages (see pipelined_window_invariance);
+    0 runs them back to back through the generator chain.
+    """
+    if (PRIME_MOD - 1) // k_val < 1:
+        return StreamResult(k_val, total, steps, 0, np.zeros(steps, dtype=np.int64)) # Window is closed
+
+    if pipeline_depth > 0:
+        return pipelined_window_invariance(k_val, total, memory_budget, steps, compact_dtypes, seed,
+                                           pipeline_depth)
+
+    chunk_size = chunk_size_for_budget(memory_budget)
+    chunks = sample_chunks(k_val, total, chunk_size, compact_dtypes, seed)
+    exit_chunks = simulate_chunks(chunks, k_val, steps, jump_block_for_budget(memory_budget))
+    return reduce_chunks(exit_chunks, k_val, total, steps)
+
+def _parse_size(text):
+    """
+    "512M", "2G", "1e11" -> int.
+    """
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    if text[-1].upper() in units:
+        return int(float(text[:-1]) * units[text[-1].upper()])
+    return int(float(text))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a Safe Window test larger than RAM.")
+    parser.add_argument("--k", type=int, nargs="+", default=[4])
+    parser.add_argument("--total", type=_parse_size, default=10**9, help="particles per K (e.g. 1e11)")
+    parser.add_argument("--memory", type=_parse_size, default=STREAM_MEMORY_BUDGET, help="e.g. 512M")
+    parser.add_argument("--steps", type=int, default=TEST_STEPS)
+    parser.add_argument("--seed", type=int, help="seed for a reproducible draw")
+    parser.add_argument("--pipeline-depth", type=int, default=PIPELINE_DEPTH,
+                        help="buffers in flight between stages (0 = run stages back to back)")
+    args = parser.parse_args(argv)
+
+    print(f"--- STREAMED VERIFICATION (N={args.total} per K, budget {args.memory >> 20} MiB) ---")
+    for k in args.k:
+        result = stream_window_invariance(k, args.total, args.memory, args.steps, seed=args.seed,
+                                          pipeline_depth=args.pipeline_depth)
+        extinction = "" if result.extinction_step is None else f"  [EXTINCT @ step {result.extinction_step}]"
+        print(f"K={k:<8} | survivors {result.survivors:<14} | {result.survival_rate:8.4f}%{extinction}")
+
+if __name__ == "__main__":
+    main()